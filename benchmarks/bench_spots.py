@@ -0,0 +1,93 @@
+from __future__ import print_function
+
+"""Compare the spot generators of RectangleCloud on the shapes of
+tests/test_cloud.py.
+
+Run from the top of the source tree:
+
+	python benchmarks/bench_spots.py
+"""
+
+import os
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(HERE, "..", "tests")]
+
+from rectangles import (
+	Rectangle,
+	RectangleCloud,
+	SPOTS_SEEDS,
+	SPOTS_MAXIMAL,
+)
+from test_cloud import CLOUDS
+
+
+R = Rectangle
+
+GENERATORS = (("seeds", SPOTS_SEEDS), ("maximal", SPOTS_MAXIMAL))
+
+SIZES = (R(0, 0, 5, 5), R(0, 0, 10, 10), R(0, 0, 20, 10), R(0, 0, 20, 20))
+
+REPEAT = 50
+
+
+def make_cloud(name, spots):
+	return RectangleCloud([r.clone() for r in CLOUDS[name].get_rects()],
+							spots=spots)
+
+
+def get_spots(name, spots):
+	"""Find the spots for every size on a fresh cloud, so building the
+	maximal empty rectangles is part of the measurement. Return the
+	number of spots found and the number of failed searches.
+	"""
+
+	cloud = make_cloud(name, spots)
+	found = failed = 0
+	for size in SIZES:
+		try:
+			found += len(cloud.get_spots_for_rectangle(size))
+		except ValueError:
+			## The seed search can't handle every shape.
+			failed += 1
+	return found, failed
+
+
+def arrange(name, spots):
+	"""Arrange the shape's rectangles from scratch. Return whether the
+	arrangement succeeded.
+	"""
+
+	cloud = make_cloud(name, spots)
+	try:
+		cloud.arrange()
+	except (ValueError, ZeroDivisionError):
+		return False
+	return True
+
+
+def measure(func, *args):
+	timer = timeit.Timer(lambda: func(*args))
+	return min(timer.repeat(3, REPEAT)) / REPEAT * 1e6
+
+
+def main():
+	results = []
+	for name in sorted(CLOUDS):
+		for label, spots in GENERATORS:
+			found, failed = get_spots(name, spots)
+			results.append((name, label,
+							measure(get_spots, name, spots), found, failed,
+							measure(arrange, name, spots),
+							arrange(name, spots) and "ok" or "failed"))
+
+	print("%-12s %-8s %12s %6s %6s %14s %7s" % ("shape", "spots",
+			"spots usec", "found", "failed", "arrange usec", "arrange"))
+	for row in results:
+		print("%-12s %-8s %12.1f %6i %6i %14.1f %7s" % row)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,75 @@
+from __future__ import print_function
+
+"""Compare the placement strategies of RectangleCloud by time and by
+density, the share of the occupied rect covered by rectangles.
+
+Run from the top of the source tree:
+
+	python benchmarks/bench_strategies.py
+"""
+
+import os
+import sys
+import time
+import random
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from rectangles import (
+	Rectangle,
+	RectangleCloud,
+	SPOTS_SEEDS,
+	SPOTS_MAXIMAL,
+	SpotStrategy,
+	SkylineStrategy,
+	MaxRectsStrategy,
+)
+
+
+## Label, strategy and spot generator. "spots" is the default cloud.
+STRATEGIES = (
+	("spots", SpotStrategy, SPOTS_SEEDS),
+	("spots-max", SpotStrategy, SPOTS_MAXIMAL),
+	("skyline", SkylineStrategy, SPOTS_SEEDS),
+	("maxrects", MaxRectsStrategy, SPOTS_SEEDS),
+)
+
+COUNTS = (100, 300, 1000)
+
+## The spot strategy is quadratic, don't wait for it on large inputs.
+LIMITS = {"spots": 300, "spots-max": 300}
+
+
+def make_rects(count, seed=0):
+	rnd = random.Random(seed)
+	return [Rectangle(0, 0, rnd.randint(1, 30), rnd.randint(1, 30))
+				for i in range(count)]
+
+
+def arrange(strategy, spots, rects, ratio=1.0):
+	cloud = RectangleCloud(rects, ratio, spots=spots, strategy=strategy())
+	start = time.time()
+	cloud.arrange()
+	duration = time.time() - start
+
+	occ = cloud.get_occupied_rect()
+	area = sum(r.get_area() for r in rects)
+	return duration, area / float(occ.get_area()), occ.get_aspect_ratio()
+
+
+def main():
+	print("%-10s %6s %10s %8s %8s" % ("strategy", "rects", "msec",
+										"density", "ratio"))
+	for count in COUNTS:
+		for label, strategy, spots in STRATEGIES:
+			if count > LIMITS.get(label, count):
+				continue
+			duration, density, ratio = arrange(strategy, spots, 
+												make_rects(count))
+			print("%-10s %6i %10.1f %8.3f %8.3f" % (label, count,
+											duration * 1e3, density, ratio))
+
+
+if __name__ == "__main__":
+	main()
@@ -1,805 +1,3888 @@
-﻿from __future__ import print_function
-
-
-"""
-Copyright (c) 2011 Malte Engelhardt
-
-Permission is hereby granted, free of charge, to any person obtaining a copy
-of this software and associated documentation files (the "Software"), to deal
-in the Software without restriction, including without limitation the rights
-to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
-copies of the Software, and to permit persons to whom the Software is
-furnished to do so, subject to the following conditions:
-
-The above copyright notice and this permission notice shall be included in
-all copies or substantial portions of the Software.
-
-THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
-IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
-FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
-AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
-LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
-OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
-THE SOFTWARE.
-"""
-
-
-import os
-import sys
-import math
-import bisect
-import operator
-
-try:
-	__version__ = tuple(map(int, os.path.split(os.path.dirname(
-			os.path.abspath(__file__)))[-1].rsplit("-", 1)[-1].split(".")))
-except ValueError:
-	__version__ = (0, 0, 0)
-
-__license__ = "MIT"
-__author__ = "Malte Engelhardt"
-__email__ = "@".join(("kurvenschubser", "gmail.com"))
-
-
-__all__ = ["Rectangle", "RectangleCloud", "get_new_ratio", "get_distance",
-			"rubberband", "center", "partition", "select_by_rect"]
-
-
-## Must be something that can be used algebraically,
-## so it can't be float('inf').
-INFINITY = INF = sys.maxint
-
-DIRECTION_UP, DIRECTION_DOWN, DIRECTION_LEFT, DIRECTION_RIGHT = range(4)
-
-SORTKEYS = {
-	DIRECTION_LEFT: lambda r: r.x, 
-	DIRECTION_DOWN: lambda r: r.y,
-	DIRECTION_RIGHT: lambda r: r.x + r.w, 
-	DIRECTION_UP: lambda r: r.y + r.h
-}
-
-HALVERS = {
-	DIRECTION_RIGHT: lambda r: r.y + r.h / 2.0,
-	DIRECTION_UP: lambda r: r.x + r.w / 2.0
-}
-HALVERS[DIRECTION_LEFT] = HALVERS[DIRECTION_RIGHT]
-HALVERS[DIRECTION_DOWN] = HALVERS[DIRECTION_UP]
-
-STAMPGETTERS = {
-		DIRECTION_RIGHT : lambda r: (r.y, r.y + r.h),
-		DIRECTION_UP: lambda r: (r.x, r.x + r.w),
-}
-STAMPGETTERS[DIRECTION_LEFT] = STAMPGETTERS[DIRECTION_RIGHT]
-STAMPGETTERS[DIRECTION_DOWN] = STAMPGETTERS[DIRECTION_UP]
-
-
-def get_new_ratio(baserect, tobeadded):
-	"""If Rectangle *tobeadded* was added to Rectangle *baserect*,
-	return the new aspect ratio.
-	"""
-
-	return baserect.get_union(tobeadded).get_aspect_ratio()
-
-
-def get_distance((p1_x, p1_y), (p2_x, p2_y)):
-	"""Return the distance from point (p1_x, p2_y) to point (p2_x, p2_y).
-	"""
-
-	return math.sqrt((p1_x - p2_x) ** 2 + (p1_y - p2_y) ** 2)
-
-
-##? migrate to class Rectangle?
-def rubberband((cx, cy), leeway, rect):
-	"""A rubberband effect minimizes the distance from the
-	center of *rect* to the point (cx, cy). Possible positions
-	are restrained by the *leeway* Rectangle. *rect* will never
-	be outside of *leeway*.
-	Returns a Rectangle with the newly found coordinates
-	and width and height of *rect*.
-	"""
-
-	## Minimize distance to x axis.
-	if cx < leeway.x + rect.w / 2.0:
-		x = leeway.x
-	elif cx > leeway.x + leeway.w - rect.w / 2.0:
-		x = leeway.x + leeway.w - rect.w
-	else:
-		x = cx - rect.w / 2.0
-
-	## Minimize distance to y axis.
-	if cy < leeway.y + rect.h / 2.0:
-		y = leeway.y
-	elif cy > leeway.y + leeway.h - rect.h / 2.0:
-		y = leeway.y + leeway.h - rect.h
-	else:
-		y = cy - rect.h / 2.0
-
-	return Rectangle(x, y, rect.w, rect.h)
-
-
-##? migrate to class Rectangle?
-def center(tobecentered, stable):
-	"""Place center of Rectangle *tobecentered* exactly on
-	center of Rectangle *stable*.
-	"""
-
-	tx, ty = tobecentered.get_center()
-	sx, sy = stable.get_center()
-
-	return Rectangle(sx - tx, sy - ty, tobecentered.w, tobecentered.h)
-
-
-def partition(rect, seed, direction):
-	"""Cut *rect* in half at *seed*. Return a Rectangle according to 
-	direction *direction*.
-	"""
-
-	x, y = seed
-	r = Rectangle()
-	if direction == DIRECTION_RIGHT:
-		r.x = x
-		r.y = rect.y
-		r.w = rect.x + rect.w - x
-		r.h = rect.h
-	elif direction == DIRECTION_LEFT:
-		r.x = rect.x
-		r.y = rect.y
-		r.w = x - (rect.x)
-		r.h = rect.h
-	elif direction == DIRECTION_UP:
-		r.x = rect.x
-		r.y = y
-		r.w = rect.w
-		r.h = rect.y + rect.h - y
-	else:
-		r.x = rect.x
-		r.y = rect.y
-		r.w = rect.w
-		r.h = y - rect.y
-	return r
-
-
-def _does_cut(r, pvt, horz):
-	"""Rectangle *r* occupies space at point *pvt*.
-	Take orientation *horz* into account.
-	"""
-
-	## it is r.y <= pvt (or r.x <= pvt) due to the way 
-	## bisect.bisect works: pvt == r.y is treated the same as 
-	## pvt > r.y and then the *leeway* rect (see below) will 
-	## be placed at r.y + r.h which is wrong.
-	return horz and (r.y <= pvt < r.y + r.h) \
-		or not horz and (r.x <= pvt < r.x + r.w)
-
-
-def select_by_rect(selectables, selector):
-	return [r for r in selectables if r.intersects(selector)]
-
-
-
-class Rectangle(object):
-	def __init__(self, x=0, y=0, w=0, h=0):
-		self.x, self.y, self.w, self.h = x, y, w, h
-
-	def __repr__(self):
-		return repr("<%s (%s, %s, %s, %s) at %i>" %(self.__class__.__name__,
-									self.x, self.y, self.w, self.h, id(self)))
-
-	def __nonzero__(self):
-		return bool(self.get_area())
-
-	def __iter__(self):
-		return iter((self.x, self.y, self.w, self.h))
-
-	def __contains__(self, (px, py)):
-		return self.x < px < self.x + self.w and self.y < py < self.y + self.h
-
-	def __eq__(self, other):
-		return (
-			self.x == other.x
-			and self.y == other.y
-			and self.w == other.w
-			and self.h == other.h
-		)
-
-	def __ne__(self, other):
-		return not self.__eq__(other)
-
-	def __getw(self):
-		return self._w
-
-	def __setw(self, val):
-		if val < 0:
-			raise ValueError("Rectangle.w must be positive. Got %s" % val)
-		self._w = val
-
-	w = width = property(__getw, __setw)
-
-	def __geth(self):
-		return self._h
-
-	def __seth(self, val):
-		if val < 0:
-			raise ValueError("Rectangle.h must be positive. Got %s" % val)
-		self._h = val
-
-	h = height = property(__geth, __seth)
-
-	def clone(self):
-		return self.__class__(*self)
-
-	def intersects(self, other):
-		"""Separating axis test."""
-
-		return not (
-			self.x >= other.x + other.w
-			or other.x >= self.x + self.w
-			or self.y >= other.y + other.h
-			or other.y >= self.y + self.h
-		)
-
-	def get_intersection(self, other):
-		if not self.intersects(other):
-			return self.__class__()
-
-		return self.__class__(
-			max(self.x, other.x),
-			max(self.y, other.y),
-			min(self.x + self.w, other.x + other.w) - max(self.x, other.x),
-			min(self.y + self.h, other.y + other.h) - max(self.y, other.y)
-		)
-
-	def get_union(self, other):
-		return self.__class__(
-			min((self.x, other.x)),
-			min((self.y, other.y)),
-			max((self.x + self.w - min((self.x, other.x)),
-				other.x + other.w - min((self.x, other.x)))),
-			max((self.y + self.h - min((self.y, other.y)),
-				other.y + other.h - min((self.y, other.y))))
-		)
-
-	def get_center(self):
-		return self.x + self.w / 2.0, self.y + self.h / 2.0
-
-	def get_aspect_ratio(self):
-		return self.w / float(self.h)
-
-	def get_area(self):
-		return self.w * self.h
-
-
-class RectangleContainer(list): pass
-
-
-class RectangleCloud(object):
-	"""For arranging Rectangles into an ellipse-like shape."""
-	
-	_SORTED_DIRECTION_FMT = "_sdir_cache_%s"
-
-	def __init__(self, rectangles=[], ratio=1.0):
-		self._rects = list(rectangles)
-		self.ratio = ratio
-
-	def __contains__(self, obj):
-		return obj in self._rects
-
-	def clone(self):
-		return self.__class__(iter(self._rects))
-
-	def move_all(self, x=0, y=0):
-		if x:
-			for r in self._rects:
-				r.x += x
-		if y:
-			for r in self._rects:
-				r.y += y
-
-	def get_sorted_left(self):
-		return self._get_sorted_DIRECTION(DIRECTION_LEFT, 
-										SORTKEYS[DIRECTION_LEFT])
-
-	def get_sorted_lower(self):
-		return self._get_sorted_DIRECTION(DIRECTION_DOWN, 
-										SORTKEYS[DIRECTION_DOWN])
-
-	def get_sorted_right(self):
-		return self._get_sorted_DIRECTION(DIRECTION_RIGHT,
-										SORTKEYS[DIRECTION_RIGHT])
-
-	def get_sorted_upper(self):
-		return self._get_sorted_DIRECTION(DIRECTION_UP, 
-										SORTKEYS[DIRECTION_UP])
-
-	def _get_sorted_DIRECTION(self, direction, sortkey):
-		attrname = self._SORTED_DIRECTION_FMT % direction
-		if not getattr(self, attrname, None) and self._rects:
-			setattr(self, attrname, sorted(self._rects, key=sortkey))
-		return getattr(self, attrname)
-
-	def _invalidate(self):
-		for direction in (DIRECTION_LEFT, DIRECTION_RIGHT,
-							DIRECTION_UP, DIRECTION_DOWN):
-			delattr(self, self._SORTED_DIRECTION_FMT % direction)
-		del self._occupied_rect
-
-	def get_rectangles(self):
-		return self._rects
-	get_rects = get_rectangles
-
-	def get_occupied_rect(self):
-		try:
-			return self._occupied_rect
-		except AttributeError:
-			left = self.get_sorted_left()[0]
-			lower = self.get_sorted_lower()[0]
-			right = self.get_sorted_right()[-1]
-			upper = self.get_sorted_upper()[-1]
-			self._occupied_rect = Rectangle(
-				left.x,
-				lower.y,
-				right.x + right.w - left.x,
-				upper.y + upper.h - lower.y
-			)
-		return self._occupied_rect
-
-	def get_selection_by_rect(self, selector):
-		return select_by_rect(self._rects, selector)
-
-	def add_rect(self, rect):
-		"""Add Rectangle *rect* to the cloud and find a 
-		non-overlapping spot for it amongst the other 
-		rectangles.
-		"""
-
-		rect.x, rect.y = 0, 0		# placement of rect is totally automatic
-		if not self._rects or not rect:
-			self._rects.append(rect)
-			return
-
-		occ = self.get_occupied_rect()
-		cx, cy = occ.get_center()
-
-		candidates = set()
-
-		for sp in self.get_spots_for_rectangle(rect):
-			cands = self.make_candidates_data(sp, rect)
-			candidates.update(cands)
-
-		if not candidates:
-			raise Exception("No candidates were found.")
-
-		rated = self.rate_candidates(candidates)
-		choice = self.choose_best_candidate(rated)
-		rect.x = choice.x
-		rect.y = choice.y
-
-		self._rects.append(rect)
-
-		## Compensate for negative coordinates
-		self.move_all(rect.x < 0 and rect.x or 0, rect.y < 0 and rect.y or 0)
-		self._invalidate()
-
-	def arrange(self):
-		rects = self._rects[:]
-		self._rects = []
-		for r in rects:
-			self.add_rect(r)
-
-	def make_candidates_data(self, spot, rect):
-		occ = self.get_occupied_rect()
-		intsec = spot.get_intersection(occ)
-		if intsec:
-			leeway = intsec
-		else:
-			## There is no intersection, so the spot points to infinity
-			## on all sides but one.
-			leeway = spot
-
-		cand = rubberband(occ.get_center(), leeway, rect)
-		return [(cand, intsec, spot)]
-
-	def rate_candidates(self, candidates_data):
-		occ = self.get_occupied_rect()
-		ratios = []
-		candidates = []
-		for cand, intsec, spot in candidates_data:
-			cand.debuginfo = dict(intsec=intsec, spot=spot)
-
-			intsec_cand_intsec = cand.get_intersection(intsec)
-
-			cand.debuginfo["intsec_cand_intsec"] = intsec_cand_intsec
-
-			## Ratio of how much of *cand* is inside *occ*.
-			inside = intsec_cand_intsec.get_area() / float(cand.get_area())
-
-			cand.debuginfo["inside"] = inside
-
-			ratio = 0.0
-			if inside:
-				## How well is the usage of space of *cand* in *intsec*?
-				usage = intsec_cand_intsec.get_area() / float(intsec.get_area())
-
-				cand.debuginfo["usage"] = usage
-				ratio = inside * usage
-
-			if (1.0 - inside):
-				## By how much unused space will the global occupied area grow?
-				excess = cand.get_union(occ).get_area() - cand.get_area() \
-							- occ.get_area() \
-							+ cand.get_intersection(occ).get_area()
-
-				cand.debuginfo["excess"] = excess
-
-				## The ratio of unused additional space to the now occupied 
-				## space.
-				excess_ratio = excess / float(occ.get_area())
-				cand.debuginfo["excess_ratio"] = excess_ratio
-
-				## How much (in percent) does the new aspect ratio
-				## deviate from the desired ratio?
-				ratio_dist = (abs(
-					occ.get_aspect_ratio()
-					/ get_new_ratio(occ, cand)
-					- self.ratio + 1
-				))
-				cand.debuginfo.update(ratio_dist=ratio_dist)
-				cand.debuginfo.update(get_new_ratio=get_new_ratio(occ,cand))
-				cand.debuginfo.update(self_ratio=self.ratio)
-
-				ratio += ((1 - inside) / excess_ratio) / (10 ** ratio_dist)
-
-			cand.debuginfo["ratio"] = ratio
-			ratios.append(ratio)
-			candidates.append(cand)
-
-		return zip(ratios, candidates)
-
-	def choose_best_candidate(self, rated_candidates):
-		return sorted(rated_candidates, key=lambda t:t[0])[-1][1]
-
-	def get_spots_for_rectangle(self, rectangle):
-		"""Return regions of empty space amongst the 
-		rectangles in the cloud where *rectangle* fits in.
-		"""
-
-		spots = []
-		for direction in (DIRECTION_RIGHT, DIRECTION_LEFT, DIRECTION_UP,
-														DIRECTION_DOWN):
-			seeds = self._get_seed_points(direction)
-			for seed in seeds:
-				sp = self._get_spot(rectangle, seed, direction)
-				if sp and sp not in spots:
-					spots.append(sp)
-		return spots
-
-	def _get_seed_points(self, direction):
-		"""Return points on the rectangles in the cloud,
-		where a search (as done in self._get_spot) can
-		start from.
-		"""
-
-		sortkey = SORTKEYS[direction]
-		halver = HALVERS[direction]
-		stampgetter = STAMPGETTERS[direction]
-
-		if direction in (DIRECTION_RIGHT, DIRECTION_LEFT):
-			seedgetter = lambda r: (sortkey(r), halver(r))
-			swapper = lambda current, half: (sortkey(current), half)
-		else:
-			seedgetter = lambda r: (halver(r), sortkey(r))
-			swapper = lambda current, half: (half, sortkey(current))
-		
-		seeds = []
-
-		s = self._get_sorted_DIRECTION(direction, sortkey)
-		if direction in (DIRECTION_RIGHT, DIRECTION_UP):
-			s.reverse()
-		
-		print(s)
-
-		cur = s[0]
-		seeds.append(seedgetter(cur))
-		stamps = [stampgetter(cur)]
-		
-		print(seeds)
-		print(stamps)
-
-		i = 1
-		while i < len(s):
-			cur = s[i]
-
-			curlo, curhi = stampgetter(cur)
-			
-			print(i)
-
-			j = 0
-			while j < len(stamps):
-				stamplo, stamphi = stamps[j]
-				
-				print("cur:", curlo, curhi)
-				print("", j, stamplo, stamphi)
-				
-
-				if curlo < stamplo <= curhi:
-					seeds.append(swapper(cur,
-									curlo + (stamplo - curlo) / 2.0))
-					stamps[j] = (curlo, stamphi)
-
-					print(" cond below")
-					print(" new stamp borders:", curlo, stamphi)
-					print(" break on curhi <= stamphi", curhi <= stamphi)
-					
-					if curhi <= stamphi:
-						break
-
-				if curlo <= stamphi < curhi:
-					## It's the last stamp or not the last stamp and
-					## the following stamps lower point is above
-					## the rects upper border.
-					if j == len(stamps) - 1 \
-						or j < len(stamps) - 1 and curhi <= stamps[j+1][0]:
-						seeds.append(swapper(cur, 
-										stamphi + (curhi - stamphi) / 2.0))
-						stamps[j] = (stamplo, curhi)
-						
-						print(" cond above")
-						print(" new stamp borders:", stamplo, curhi)
-						print(" break")
-						break
-						
-				if curhi < stamplo:
-					seeds.append(swapper(cur,
-									curlo + (curhi - curlo) / 2.0))
-					stamps.append(stampgetter(cur))
-					
-					print(" cond curhi < stamplo")
-					print(" stamp appended:", stamps[-1])
-
-					break
-
-				curlo = stamphi
-				j += 1
-
-			stamps.sort()
-			i += 1
-		return seeds
-
-	def	_get_spot(self, rectangle, seed, direction):
-		"""Return a region of empty space between the
-		rectangles of the cloud where *rectangle* fits in,
-		or *None* if the search fails.
-
-		A spot's borders are defined by rectangles 
-		encountered in a search. The search begins at
-		the point *seed* and first tries to accomodate
-		*rectangle* on the axis perpendicular to
-		*direction*, so it is not blocked by other
-		rectangles along that axis. E.g.: 
-			
-			*direction* == DIRECTION_RIGHT =>
-				Accomodate along vertical axis.
-			*direction* == DIRECTION_DOWN =>
-				Accomodate along horizontal axis.
-
-		From the accomodation point, the search continues
-		along *direction* until it hits a rectangle. The 
-		border of that rectangle that is nearest to *seed*
-		determines the 'upper' limit of the spot (the 
-		'lower' one being determined by *seed*). If there 
-		are no rectangles encountered, the spot points
-		to *INFINITY* in that direction.
-
-		From there, the selection is extended on its sides. 
-		The nearest Rectangles found determine the sides of 
-		the spot.
-
-		Parameters:
-			*rectangle*: type Rectangle.
-			*seed*: type tuple, length 2.
-			*direction*: type int, one of (
-							DIRECTION_RIGHT, 
-							DIRECTION_LEFT, 
-							DIRECTION_UP,
-							DIRECTION_DOWN
-						)
-		"""
-		
-		sx, sy = seed
-
-		facing_right = direction == DIRECTION_RIGHT
-		facing_up = direction == DIRECTION_UP
-		facing_left = direction == DIRECTION_LEFT
-		facing_down = direction == DIRECTION_DOWN
-		horizontal = facing_left or facing_right
-
-		occ = self.get_occupied_rect()
-
-		sel = partition(occ, seed, direction)
-		sidesel = sel.clone()
-		ortsel = Rectangle(
-			0,
-			0, 
-			sel.w if horizontal else rectangle.w,
-			sel.h if not horizontal else rectangle.h
-		)
-
-		if horizontal:
-			sortkey_sides = lambda r: r.y
-			pivot = sy
-		else:
-			sortkey_sides = lambda r: r.x
-			pivot = sx
-
-		selection = self.get_selection_by_rect(sel)
-
-		########################################################
-		##  Make sure *rectangle* fits on the sideways axis.  ##
-		## Move *ortsel* so its middle is closest to *pivot*. ##
-		########################################################
-
-		restrictor = Rectangle(
-			sel.x + (sel.w - rectangle.w) * facing_left,
-			sel.y + (sel.h - rectangle.h) * facing_down,
-			rectangle.w if horizontal else sel.w,
-			rectangle.h if not horizontal else sel.h
-		)
-		
-		leeway = sel.clone()
-
-		sideways = select_by_rect(selection, restrictor)
-		if sideways:
-			sideways.sort(key=sortkey_sides)
-			extract = [sortkey_sides(r) for r in sideways]
-			i = bisect.bisect(extract, pivot)
-
-			## Fringe case 1: sy is below lowest rect's y.
-			if not i:
-				ir = sideways[0]
-				if horizontal:
-					leeway.y = min((leeway.y, ir.y - rectangle.h))
-					leeway.h = ir.y - leeway.y
-				else:
-					leeway.x = min((leeway.x, ir.x - rectangle.w))
-					leeway.w = ir.x - leeway.x
-
-			## Fringe case 2: sy is above highest rect's y.
-			elif i == len(sideways):
-				ir = sideways[-1]
-
-				if _does_cut(ir, pivot, horizontal):
-					return None
-
-				if horizontal:
-					leeway.y = ir.y + ir.h
-					leeway.h = max((leeway.y + rectangle.h, sel.y + sel.h)) \
-								- leeway.y
-				else:
-					leeway.x = ir.x + ir.w
-					leeway.w = max((leeway.x + rectangle.w, sel.x + sel.w)) \
-								- leeway.x
-
-			## Norm case: sy is inside the rects' y values.
-			else:
-				ir0 = sideways[i-1]
-				if _does_cut(ir0, pivot, horizontal):
-					return None
-
-				ir1 = sideways[i]
-				## space between ir0 and ir1 is too small for rectangle.
-				if horizontal and (ir1.y - (ir0.y + ir0.h) < rectangle.h) \
-					or not horizontal and (ir1.x - (ir0.x + ir0.w) < rectangle.w):
-					return None
-
-				if horizontal:
-					leeway.y = ir0.y + ir0.h
-					leeway.h = ir1.y - leeway.y
-				else:
-					leeway.x = ir0.x + ir0.w
-					leeway.w = ir1.x - leeway.x
-
-		ortsel = rubberband(seed, leeway, ortsel)
-
-		############################################
-		## Determine orthogonal top of *sidesel*. ##
-		############################################
-
-		orthogonals = select_by_rect(selection, ortsel)
-		if orthogonals:
-			if facing_left:
-				sortkey_orth = lambda r: r.x + r.w
-			elif facing_right:
-				sortkey_orth = lambda r: r.x
-			elif facing_up:
-				sortkey_orth = lambda r: r.y
-			elif facing_down:
-				sortkey_orth = lambda r: r.y + r.h
-
-			orthogonals.sort(key=sortkey_orth, 
-								reverse=(facing_right or facing_up))
-
-			sr = orthogonals[-1]
-			if facing_left:
-				sidesel.x = sr.x + sr.w
-				sidesel.w = sel.x + sel.w - sidesel.x
-			elif facing_right:
-				sidesel.w = sr.x - sel.x
-			elif facing_down:
-				sidesel.y = sr.y + sr.h
-				sidesel.h = sel.y + sel.h - sidesel.y
-			elif facing_up:
-				sidesel.h = sr.y - sel.y
-		else:
-			if facing_left:
-				sidesel.x = sel.x - INF
-				sidesel.w = INF + sel.w
-			elif facing_right:
-				sidesel.w = INF + sel.w
-			elif facing_up:
-				sidesel.h = INF + sel.h
-			elif facing_down:
-				sidesel.y = sel.y - INF
-				sidesel.h = INF + sel.h
-
-		####################################
-		## Select values for side bounds. ##
-		####################################
-
-		sideways = select_by_rect(selection, sidesel)
-		if sideways:
-			sideways.sort(key=sortkey_sides)
-			extract = [sortkey_sides(r) for r in sideways]
-			i = bisect.bisect(extract, pivot)
-
-			## Fringe case 1: *pivot* is below lowest rect's pivot value.
-			if not i:
-				if horizontal:
-					sidesel.y = sel.y - INF
-					sidesel.h = sideways[0].y - sel.y + INF
-				else:
-					sidesel.x = sel.x - INF
-					sidesel.w = sideways[0].x - sel.x + INF
-
-			## Fringe case 2: *pivot* is above highest rect's pivot value.
-			elif i == len(sideways):
-				ir = sideways[-1]
-
-				if _does_cut(ir, pivot, horizontal):
-					return None
-
-				if horizontal:
-					sidesel.y = ir.y + ir.h
-					sidesel.h = sel.y + sel.h - sidesel.y + INF
-				else:
-					sidesel.x = ir.x + ir.w
-					sidesel.w = sel.x + sel.w - sidesel.x + INF
-
-			## Norm case: *pivot* is inside the rects' 
-			## corresponding axis' values.
-			else:
-				ir0 = sideways[i-1]
-
-				if _does_cut(ir0, pivot, horizontal):
-					return None
-
-				ir1 = sideways[i]
-				## space between ir0 and ir1 is too small for rectangle.
-				if horizontal and (ir1.y - (ir0.y + ir0.h) < rectangle.h) \
-					or not horizontal and (ir1.x - (ir0.x + ir0.w) < rectangle.w):
-					return None
-
-				if horizontal:
-					sidesel.y = ir0.y + ir0.h
-					sidesel.h = ir1.y - sidesel.y
-				else:
-					sidesel.x = ir0.x + ir0.w
-					sidesel.w = ir1.x - sidesel.x
-		else:
-			if horizontal:
-				sidesel.y = sel.y - INF
-				sidesel.h = sel.h + 2 * INF
-			else:
-				sidesel.x = sel.x - INF
-				sidesel.w = sel.w + 2 * INF
-
-		return sidesel
+﻿from __future__ import print_function
+
+
+"""
+Copyright (c) 2011 Malte Engelhardt
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import os
+import sys
+import csv
+import json
+import math
+import mmap
+import time
+import Queue
+import array
+import bisect
+import socket
+import struct
+import sqlite3
+import heapq
+import hashlib
+import argparse
+import operator
+import weakref
+import threading
+import itertools
+import contextlib
+import SocketServer
+import BaseHTTPServer
+import collections
+import multiprocessing
+
+## NumPy, imported by _get_numpy when the array functions are first 
+## used, not with this module.
+numpy = None
+
+try:
+	__version__ = tuple(map(int, os.path.split(os.path.dirname(
+			os.path.abspath(__file__)))[-1].rsplit("-", 1)[-1].split(".")))
+except ValueError:
+	__version__ = (0, 0, 0)
+
+__license__ = "MIT"
+__author__ = "Malte Engelhardt"
+__email__ = "@".join(("kurvenschubser", "gmail.com"))
+
+
+__all__ = ["Rectangle", "RectangleCloud", "MaximalRectangles",
+			"PlacementStrategy", "SpotStrategy", "SkylineStrategy",
+			"MaxRectsStrategy", "LayoutCache", "LayoutCheckpoint",
+			"RectangleIndex", "LayoutServer", "ConcurrentCloud",
+			"CloudRectangle", "SharedCloud",
+			"get_new_ratio", "get_distance", "rubberband", "center", 
+			"partition", "select_by_rect", "get_new_ratio_many", 
+			"get_distance_many", "rubberband_many", "center_many", 
+			"partition_many"]
+
+
+## Must be something that can be used algebraically,
+## so it can't be float('inf').
+INFINITY = INF = sys.maxint
+
+## The unbounded sides of the free space around a cloud, see 
+## MaximalRectangles. Never subtracted from, so float edges stay exact.
+UNBOUNDED = float("inf")
+
+## How far float Rectangles may overlap, relative to the size of the 
+## coordinates of the cloud, and still count as touching. Moving a 
+## cloud rounds the position of each Rectangle on its own, so ones 
+## that touched may overlap by the last bits of their edges after.
+ROUNDING = 2 ** -36
+
+## Smallest amount by which a rating divisor may shrink.
+EPSILON = 1e-9
+
+DIRECTION_UP, DIRECTION_DOWN, DIRECTION_LEFT, DIRECTION_RIGHT = range(4)
+
+## Generators of spots for RectangleCloud.get_spots_for_rectangle.
+SPOTS_SEEDS, SPOTS_MAXIMAL = range(2)
+
+## Kinds of changes recorded by RectangleCloud.savepoint.
+JOURNAL_APPEND, JOURNAL_MOVE, JOURNAL_FREE, JOURNAL_ATTRS, \
+	JOURNAL_ARRANGE, JOURNAL_REMOVE, JOURNAL_RESIZE = range(7)
+
+## Kinds of changes passed to the observers of a RectangleCloud, see 
+## RectangleCloud.subscribe.
+EVENT_ADD, EVENT_MOVE, EVENT_REMOVE, EVENT_RESIZE = range(4)
+
+## Placeholder for attributes that were not set.
+_MISSING = object()
+
+## The file format of RectangleCloud.save: a header, then the x, y, w 
+## and h of all Rectangles as columns of little-endian doubles, then,
+## with SNAPSHOT_INDEXES, the positions of the Rectangles in the sorted
+## lists of each direction as columns of little-endian uint32, then, 
+## with SNAPSHOT_RTREE, the RectangleIndex: its node size, the number 
+## of its levels and the levels as little-endian uint32, then its 
+## indices as uint32 and its boxes as doubles.
+SNAPSHOT_MAGIC = "RECTCLD\0"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_INDEXES = 1
+SNAPSHOT_RTREE = 2
+_SNAPSHOT_HEADER = struct.Struct("<8sHHQdi")
+_UINT32 = "I" if array.array("I").itemsize == 4 else "L"
+
+## Number of children of the nodes of a RectangleIndex.
+INDEX_NODE_SIZE = 16
+
+## Rectangles per shard of RectangleCloud.arrange_sharded.
+SHARD_SIZE = 5000
+
+SORTKEYS = {
+	DIRECTION_LEFT: lambda r: r.x, 
+	DIRECTION_DOWN: lambda r: r.y,
+	DIRECTION_RIGHT: lambda r: r.x + r.w, 
+	DIRECTION_UP: lambda r: r.y + r.h
+}
+
+HALVERS = {
+	DIRECTION_RIGHT: lambda r: r.y + r.h / 2.0,
+	DIRECTION_UP: lambda r: r.x + r.w / 2.0
+}
+HALVERS[DIRECTION_LEFT] = HALVERS[DIRECTION_RIGHT]
+HALVERS[DIRECTION_DOWN] = HALVERS[DIRECTION_UP]
+
+STAMPGETTERS = {
+		DIRECTION_RIGHT : lambda r: (r.y, r.y + r.h),
+		DIRECTION_UP: lambda r: (r.x, r.x + r.w),
+}
+STAMPGETTERS[DIRECTION_LEFT] = STAMPGETTERS[DIRECTION_RIGHT]
+STAMPGETTERS[DIRECTION_DOWN] = STAMPGETTERS[DIRECTION_UP]
+
+
+def get_new_ratio(baserect, tobeadded):
+	"""If Rectangle *tobeadded* was added to Rectangle *baserect*,
+	return the new aspect ratio.
+	"""
+
+	return baserect.get_union(tobeadded).get_aspect_ratio()
+
+
+def get_distance((p1_x, p1_y), (p2_x, p2_y)):
+	"""Return the distance from point (p1_x, p2_y) to point (p2_x, p2_y).
+	"""
+
+	return math.sqrt((p1_x - p2_x) ** 2 + (p1_y - p2_y) ** 2)
+
+
+##? migrate to class Rectangle?
+def rubberband((cx, cy), leeway, rect):
+	"""A rubberband effect minimizes the distance from the
+	center of *rect* to the point (cx, cy). Possible positions
+	are restrained by the *leeway* Rectangle. *rect* will never
+	be outside of *leeway*.
+	Returns a Rectangle with the newly found coordinates
+	and width and height of *rect*.
+	"""
+
+	## Minimize distance to x axis.
+	if cx < leeway.x + rect.w / 2.0:
+		x = leeway.x
+	elif cx > leeway.x + leeway.w - rect.w / 2.0:
+		x = leeway.x + leeway.w - rect.w
+	else:
+		x = cx - rect.w / 2.0
+
+	## Minimize distance to y axis.
+	if cy < leeway.y + rect.h / 2.0:
+		y = leeway.y
+	elif cy > leeway.y + leeway.h - rect.h / 2.0:
+		y = leeway.y + leeway.h - rect.h
+	else:
+		y = cy - rect.h / 2.0
+
+	return Rectangle(x, y, rect.w, rect.h)
+
+
+##? migrate to class Rectangle?
+def center(tobecentered, stable):
+	"""Place center of Rectangle *tobecentered* exactly on
+	center of Rectangle *stable*.
+	"""
+
+	tx, ty = tobecentered.get_center()
+	sx, sy = stable.get_center()
+
+	return Rectangle(sx - tx, sy - ty, tobecentered.w, tobecentered.h)
+
+
+def partition(rect, seed, direction):
+	"""Cut *rect* in half at *seed*. Return a Rectangle according to 
+	direction *direction*. A *seed* beyond the edges of *rect*, e.g. 
+	by the rounding of float edges, gives an empty half.
+	"""
+
+	x, y = seed
+	r = Rectangle()
+	if direction == DIRECTION_RIGHT:
+		r.x = x
+		r.y = rect.y
+		r.w = max(rect.x + rect.w - x, 0)
+		r.h = rect.h
+	elif direction == DIRECTION_LEFT:
+		r.x = rect.x
+		r.y = rect.y
+		r.w = max(x - (rect.x), 0)
+		r.h = rect.h
+	elif direction == DIRECTION_UP:
+		r.x = rect.x
+		r.y = y
+		r.w = rect.w
+		r.h = max(rect.y + rect.h - y, 0)
+	else:
+		r.x = rect.x
+		r.y = rect.y
+		r.w = rect.w
+		r.h = max(y - rect.y, 0)
+	return r
+
+
+def _get_reach(occ, rect):
+	"""Return how far the spots for *rect* reach out of the occupied 
+	rect *occ* when they can't reach to INF: a float added to INF loses
+	the edges of the cloud. Any candidate for *rect* fits in that far.
+	"""
+
+	return occ.w + occ.h + rect.w + rect.h
+
+
+## The array versions of the functions above take N rectangles as their
+## columns (x, y, w, h) and N points as (x, y), each column a NumPy 
+## array or a number, which is broadcast. A Rectangle or a point is 
+## one row. They return arrays, rectangles as a tuple of columns.
+
+def _get_numpy():
+	global numpy
+	if numpy is None:
+		try:
+			import numpy as module
+		except ImportError:
+			raise ImportError("The array functions need NumPy")
+		numpy = module
+	return numpy
+
+
+def _get_columns(values):
+	return [_get_numpy().asarray(c, dtype=float) for c in values]
+
+
+def get_new_ratio_many(baserect, tobeadded):
+	"""Array version of get_new_ratio."""
+
+	bx, by, bw, bh = _get_columns(baserect)
+	tx, ty, tw, th = _get_columns(tobeadded)
+	x, y = numpy.minimum(bx, tx), numpy.minimum(by, ty)
+	return numpy.maximum(bx + bw - x, tx + tw - x) \
+			/ numpy.maximum(by + bh - y, ty + th - y)
+
+
+def get_distance_many(p1, p2):
+	"""Array version of get_distance."""
+
+	p1_x, p1_y = _get_columns(p1)
+	p2_x, p2_y = _get_columns(p2)
+	return numpy.sqrt((p1_x - p2_x) ** 2 + (p1_y - p2_y) ** 2)
+
+
+def rubberband_many(point, leeway, rect):
+	"""Array version of rubberband."""
+
+	cx, cy = _get_columns(point)
+	lx, ly, lw, lh = _get_columns(leeway)
+	rx, ry, rw, rh = _get_columns(rect)
+	x = numpy.where(cx < lx + rw / 2.0, lx, 
+			numpy.where(cx > lx + lw - rw / 2.0, lx + lw - rw, cx - rw / 2.0))
+	y = numpy.where(cy < ly + rh / 2.0, ly, 
+			numpy.where(cy > ly + lh - rh / 2.0, ly + lh - rh, cy - rh / 2.0))
+	return tuple(numpy.broadcast_arrays(x, y, rw, rh))
+
+
+def center_many(tobecentered, stable):
+	"""Array version of center."""
+
+	tx, ty, tw, th = _get_columns(tobecentered)
+	sx, sy, sw, sh = _get_columns(stable)
+	return tuple(numpy.broadcast_arrays(
+		(sx + sw / 2.0) - (tx + tw / 2.0), (sy + sh / 2.0) - (ty + th / 2.0),
+		tw, th))
+
+
+def partition_many(rect, seed, direction):
+	"""Array version of partition. *direction* may be an array too."""
+
+	x, y = _get_columns(seed)
+	rx, ry, rw, rh = _get_columns(rect)
+	direction = numpy.asarray(direction)
+	right, left = direction == DIRECTION_RIGHT, direction == DIRECTION_LEFT
+	up = direction == DIRECTION_UP
+	return tuple(numpy.broadcast_arrays(
+		numpy.where(right, x, rx),
+		numpy.where(up, y, ry),
+		numpy.where(right, rx + rw - x, numpy.where(left, x - rx, rw)),
+		numpy.where(up, ry + rh - y, 
+					numpy.where(right | left, rh, y - ry))))
+
+
+def _get_intersection_many(a, b):
+	"""Array version of Rectangle.get_intersection, with rows of 0 where
+	the rectangles don't intersect.
+	"""
+
+	ax, ay, aw, ah = _get_columns(a)
+	bx, by, bw, bh = _get_columns(b)
+	hit = ~((ax >= bx + bw) | (bx >= ax + aw) | (ay >= by + bh) 
+			| (by >= ay + ah))
+	x, y = numpy.maximum(ax, bx), numpy.maximum(ay, by)
+	return tuple(numpy.where(hit, c, 0.0) for c in numpy.broadcast_arrays(
+		x, y, numpy.minimum(ax + aw, bx + bw) - x, 
+		numpy.minimum(ay + ah, by + bh) - y))
+
+
+def _does_cut(r, pvt, horz):
+	"""Rectangle *r* occupies space at point *pvt*.
+	Take orientation *horz* into account.
+	"""
+
+	## it is r.y <= pvt (or r.x <= pvt) due to the way 
+	## bisect.bisect works: pvt == r.y is treated the same as 
+	## pvt > r.y and then the *leeway* rect (see below) will 
+	## be placed at r.y + r.h which is wrong.
+	return horz and (r.y <= pvt < r.y + r.h) \
+		or not horz and (r.x <= pvt < r.x + r.w)
+
+
+def _is_sliver(a, b, slack):
+	"""Whether intersecting Rectangles *a* and *b* overlap by no more 
+	than *slack* on an axis, which only rounding float edges does.
+	"""
+
+	for a0, a1, b0, b1 in ((a.x, a.x + a.w, b.x, b.x + b.w), 
+							(a.y, a.y + a.h, b.y, b.y + b.h)):
+		depth = min(a1, b1) - max(a0, b0)
+		if isinstance(depth, float) and 0 < depth <= slack:
+			return True
+	return False
+
+
+def select_by_rect(selectables, selector):
+	return [r for r in selectables if r.intersects(selector)]
+
+
+
+class Rectangle(object):
+	## What self.__getstate__ leaves out.
+	_UNPICKLED = frozenset(["x", "y", "_w", "_h", "debuginfo"])
+
+	def __init__(self, x=0, y=0, w=0, h=0):
+		self.x, self.y, self.w, self.h = x, y, w, h
+
+	def __repr__(self):
+		return repr("<%s (%s, %s, %s, %s) at %i>" %(self.__class__.__name__,
+									self.x, self.y, self.w, self.h, id(self)))
+
+	def __nonzero__(self):
+		return bool(self.get_area())
+
+	def __iter__(self):
+		return iter((self.x, self.y, self.w, self.h))
+
+	def __contains__(self, (px, py)):
+		return self.x < px < self.x + self.w and self.y < py < self.y + self.h
+
+	def __eq__(self, other):
+		return (
+			self.x == other.x
+			and self.y == other.y
+			and self.w == other.w
+			and self.h == other.h
+		)
+
+	def __ne__(self, other):
+		return not self.__eq__(other)
+
+	def __getstate__(self):
+		## Leave out the debuginfo of candidates, and the x, y, w and h
+		## that self.__reduce__ passes to __init__.
+		return dict((name, value) for name, value in self.__dict__.items()
+					if name not in self._UNPICKLED)
+
+	def __reduce__(self):
+		state = self.__getstate__()
+		if not state:
+			return self.__class__, tuple(self)
+		return self.__class__, tuple(self), state
+
+	def __getw(self):
+		return self._w
+
+	def __setw(self, val):
+		if val < 0:
+			raise ValueError("Rectangle.w must be positive. Got %s" % val)
+		self._w = val
+
+	w = width = property(__getw, __setw)
+
+	def __geth(self):
+		return self._h
+
+	def __seth(self, val):
+		if val < 0:
+			raise ValueError("Rectangle.h must be positive. Got %s" % val)
+		self._h = val
+
+	h = height = property(__geth, __seth)
+
+	def clone(self):
+		return self.__class__(*self)
+
+	def intersects(self, other):
+		"""Separating axis test."""
+
+		return not (
+			self.x >= other.x + other.w
+			or other.x >= self.x + self.w
+			or self.y >= other.y + other.h
+			or other.y >= self.y + self.h
+		)
+
+	def get_intersection(self, other):
+		if not self.intersects(other):
+			return self.__class__()
+
+		return self.__class__(
+			max(self.x, other.x),
+			max(self.y, other.y),
+			min(self.x + self.w, other.x + other.w) - max(self.x, other.x),
+			min(self.y + self.h, other.y + other.h) - max(self.y, other.y)
+		)
+
+	def get_union(self, other):
+		return self.__class__(
+			min((self.x, other.x)),
+			min((self.y, other.y)),
+			max((self.x + self.w - min((self.x, other.x)),
+				other.x + other.w - min((self.x, other.x)))),
+			max((self.y + self.h - min((self.y, other.y)),
+				other.y + other.h - min((self.y, other.y))))
+		)
+
+	def get_center(self):
+		return self.x + self.w / 2.0, self.y + self.h / 2.0
+
+	def get_aspect_ratio(self):
+		return self.w / float(self.h)
+
+	def get_area(self):
+		return self.w * self.h
+
+
+class RectangleContainer(list): pass
+
+
+class MaximalRectangles(object):
+	"""The maximal empty rectangles of a region, i.e. the regions of 
+	free space that can't be extended on any side without hitting an 
+	added Rectangle or the border of the region.
+
+	The set is maintained incrementally: adding a Rectangle only splits
+	the free rectangles it cuts into, and the pieces that are contained
+	in other free rectangles are swept out again.
+
+	Free rectangles are kept as edge tuples (x0, y0, x1, y1) and ordered
+	by width. The ones wide enough for a given size are found by 
+	bisection, but their heights are checked one by one, and adding a 
+	Rectangle scans all free rectangles. Moving the region only moves 
+	its origin.
+
+	Without a *frame*, the region is the whole plane, and the sides of 
+	free rectangles that reach out of it are at +-UNBOUNDED. The 
+	Rectangles returned end there instead at a reach beyond the box of 
+	the Rectangles carved out, see self._get_rect.
+	"""
+
+	_shared = False
+
+	def __init__(self, frame=None):
+		if frame is None:
+			edges = (-UNBOUNDED, -UNBOUNDED, UNBOUNDED, UNBOUNDED)
+		else:
+			edges = (frame.x, frame.y, frame.x + frame.w, frame.y + frame.h)
+		self.count = 0
+		self._dx = self._dy = 0
+		self._box = None
+		self._free = []
+		self._widths = []
+		self._insert(edges)
+
+	def __len__(self):
+		return len(self._free)
+
+	def __iter__(self):
+		for edges in self._free:
+			yield self._get_rect(edges, 0, 0)
+
+	def _get_rect(self, edges, w, h):
+		"""Return the free rectangle of *edges* as a Rectangle. Its 
+		unbounded sides reach out of the box of the Rectangles carved 
+		out as far as the box and a Rectangle of width *w* and height 
+		*h* span together, which is enough room for that Rectangle on 
+		any side. Only finite edges are moved by the origin.
+		"""
+
+		x0, y0, x1, y1 = edges
+		bx0, by0, bx1, by1 = self._box or (0, 0, 0, 0)
+		reach = max(bx1 - bx0 + by1 - by0 + w + h, 1)
+		if x0 == -UNBOUNDED:
+			x0 = bx0 - reach
+		if y0 == -UNBOUNDED:
+			y0 = by0 - reach
+		if x1 == UNBOUNDED:
+			x1 = bx1 + reach
+		if y1 == UNBOUNDED:
+			y1 = by1 + reach
+		return Rectangle(x0 + self._dx, y0 + self._dy, x1 - x0, y1 - y0)
+
+	def copy(self):
+		"""Return a copy that shares the free rectangles with this one
+		until either of them is added to.
+		"""
+
+		other = self.__class__.__new__(self.__class__)
+		other.__dict__.update(self.__dict__)
+		self._shared = other._shared = True
+		return other
+
+	def _insert(self, edges):
+		w = edges[2] - edges[0]
+		i = bisect.bisect(self._widths, w)
+		self._widths.insert(i, w)
+		self._free.insert(i, edges)
+
+	def _remove(self, edges):
+		i = bisect.bisect_left(self._widths, edges[2] - edges[0])
+		while self._free[i] != edges:
+			i += 1
+		del self._widths[i]
+		del self._free[i]
+
+	def _is_contained(self, edges):
+		x0, y0, x1, y1 = edges
+		i = bisect.bisect_left(self._widths, x1 - x0)
+		for f in self._free[i:]:
+			if f[0] <= x0 and f[1] <= y0 and x1 <= f[2] and y1 <= f[3]:
+				return True
+		return False
+
+	def _unshare(self):
+		if self._shared:
+			self._free = list(self._free)
+			self._widths = list(self._widths)
+			self._shared = False
+
+	def add(self, rect):
+		"""Carve Rectangle *rect* out of the free space. Return the 
+		change, for self.revert. Takes time linear in the number of free
+		rectangles, for each piece that is cut off.
+		"""
+
+		self.count += 1
+		box = self._box
+		if not rect:
+			return (), (), box
+
+		self._unshare()
+
+		rx0, ry0 = rect.x - self._dx, rect.y - self._dy
+		rx1, ry1 = rx0 + rect.w, ry0 + rect.h
+		if box is None:
+			self._box = (rx0, ry0, rx1, ry1)
+		else:
+			self._box = (min(box[0], rx0), min(box[1], ry0), 
+							max(box[2], rx1), max(box[3], ry1))
+		cut = [f for f in self._free
+				if f[0] < rx1 and rx0 < f[2] and f[1] < ry1 and ry0 < f[3]]
+
+		pieces = []
+		for f in cut:
+			self._remove(f)
+			x0, y0, x1, y1 = f
+			if x0 < rx0:
+				pieces.append((x0, y0, rx0, y1))
+			if rx1 < x1:
+				pieces.append((rx1, y0, x1, y1))
+			if y0 < ry0:
+				pieces.append((x0, y0, x1, ry0))
+			if ry1 < y1:
+				pieces.append((x0, ry1, x1, y1))
+
+		## Sweep the pieces largest first, so a piece that is not maximal
+		## is always met after the free rectangle containing it.
+		pieces.sort(key=_get_extent_key, reverse=True)
+		inserted = []
+		for p in pieces:
+			if not self._is_contained(p):
+				self._insert(p)
+				inserted.append(p)
+		return cut, inserted, box
+
+	def revert(self, change):
+		"""Undo a *change* returned by self.add. Changes have to be
+		reverted latest first.
+		"""
+
+		cut, inserted, self._box = change
+		self._unshare()
+		for p in inserted:
+			self._remove(p)
+		for f in cut:
+			self._insert(f)
+		self.count -= 1
+
+	def move(self, x=0, y=0):
+		self._dx += x
+		self._dy += y
+
+	def get_fitting(self, w, h):
+		"""Return the free rectangles that can hold a Rectangle of 
+		width *w* and height *h*. Takes O(log n + m) for the m free 
+		rectangles that are at least *w* wide.
+		"""
+
+		i = bisect.bisect_left(self._widths, w)
+		return [self._get_rect(edges, w, h) for edges in self._free[i:] 
+					if edges[3] - edges[1] >= h]
+
+
+def _get_extent_key(edges):
+	"""Return a key of the edges (x0, y0, x1, y1) of a free rectangle 
+	that is no larger than that of one containing it. On each axis, a 
+	side at UNBOUNDED counts more than any length, and the finite edge 
+	of a half-bounded one tells how far it reaches.
+	"""
+
+	key = []
+	for lo, hi in ((edges[0], edges[2]), (edges[1], edges[3])):
+		if lo == -UNBOUNDED and hi == UNBOUNDED:
+			key.append((2, 0))
+		elif lo == -UNBOUNDED:
+			key.append((1, hi))
+		elif hi == UNBOUNDED:
+			key.append((1, -lo))
+		else:
+			key.append((0, hi - lo))
+	return key
+
+
+class RectangleIndex(object):
+	"""A static R-tree of the Rectangles *rects*, packed by 
+	Sort-Tile-Recursive into flat arrays. Queries yield the positions of
+	Rectangles in *rects*, so the index stays valid for copies of the 
+	Rectangles.
+
+	The boxes (x0, y0, x1, y1) of the Rectangles come first, sorted into
+	tiles of *node_size*, followed by the boxes of the nodes, level by 
+	level up to the root. An entry's index is the position of a 
+	Rectangle for the leaves, and the position of the first child for 
+	the nodes.
+	"""
+
+	def __init__(self, rects, node_size=INDEX_NODE_SIZE):
+		self.node_size = size = node_size
+		self.count = n = len(rects)
+
+		centers = [(r.x + r.w / 2.0, r.y + r.h / 2.0) for r in rects]
+		order = sorted(range(n), key=lambda i: centers[i][0])
+		slab = size * int(math.ceil(math.sqrt(math.ceil(n / float(size)))))
+		order = [i for start in range(0, n, slab or 1) 
+					for i in sorted(order[start:start + slab], 
+									key=lambda i: centers[i][1])]
+
+		self._boxes = boxes = array.array("d")
+		for i in order:
+			r = rects[i]
+			boxes.extend((r.x, r.y, r.x + r.w, r.y + r.h))
+		self._indices = indices = array.array(_UINT32, order)
+		self._levels = levels = [n]
+		start = 0
+		while levels[-1] - start > 1:
+			end = levels[-1]
+			for first in range(start, end, size):
+				children = boxes[4 * first:4 * min(first + size, end)]
+				boxes.extend((min(children[0::4]), min(children[1::4]),
+								max(children[2::4]), max(children[3::4])))
+				indices.append(first)
+			start = end
+			levels.append(len(indices))
+
+	def __len__(self):
+		return self.count
+
+	def _save(self, f):
+		f.write(struct.pack("<II", self.node_size, len(self._levels)))
+		_write_array(f, _UINT32, self._levels)
+		_write_array(f, _UINT32, self._indices)
+		_write_array(f, "d", self._boxes)
+
+	@classmethod
+	def _load(cls, buf, offset):
+		"""Return the index saved at byte *offset* of the buffer *buf* by
+		self._save, reading its arrays from the buffer.
+		"""
+
+		index = cls.__new__(cls)
+		index.node_size, depth = struct.unpack_from("<II", buf, offset)
+		offset += 8
+		index._levels = list(struct.unpack_from("<%iI" % depth, buf, offset))
+		index.count = index._levels[0]
+		entries = index._levels[-1]
+		offset += 4 * depth
+		index._indices = _BufferArray(buf, offset, entries, "I")
+		index._boxes = _BufferArray(buf, offset + 4 * entries, 
+									4 * entries, "d")
+		return index
+
+	@staticmethod
+	def _get_saved_size(buf, offset):
+		"""Return the number of bytes and of Rectangles of the index 
+		saved at byte *offset* of the buffer *buf* by self._save, or 
+		None if the buffer ends before its levels do.
+		"""
+
+		if len(buf) < offset + 8:
+			return None
+		depth = struct.unpack_from("<II", buf, offset)[1]
+		if not depth or len(buf) < offset + 8 + 4 * depth:
+			return None
+		levels = struct.unpack_from("<%iI" % depth, buf, offset + 8)
+		return 8 + 4 * depth + 36 * levels[-1], levels[0]
+
+	def _get_children(self, entry):
+		first = self._indices[entry]
+		levels = self._levels
+		return range(first, min(first + self.node_size, 
+								levels[bisect.bisect(levels, first)]))
+
+	def _search(self, test):
+		"""Yield the positions of the Rectangles whose boxes pass *test*,
+		a function of x0, y0, x1 and y1 that passes the boxes of the 
+		nodes around them too. They come in the order of the leaves, 
+		i.e. tile by tile.
+		"""
+
+		if not self.count:
+			return
+		boxes, indices, n = self._boxes, self._indices, self.count
+		root = len(indices) - 1
+		if not test(*boxes[4 * root:4 * root + 4]):
+			return
+		stack = [root]
+		while stack:
+			entry = stack.pop()
+			if entry < n:
+				yield indices[entry]
+				continue
+			for child in reversed(self._get_children(entry)):
+				if test(*boxes[4 * child:4 * child + 4]):
+					stack.append(child)
+
+	def get_containing(self, x, y):
+		"""Yield the positions of the Rectangles that contain the point
+		(*x*, *y*). The left and lower edges of a Rectangle belong to 
+		it, the right and upper ones don't.
+		"""
+
+		return self._search(
+			lambda x0, y0, x1, y1: x0 <= x < x1 and y0 <= y < y1)
+
+	def get_intersecting(self, x0, y0, x1, y1):
+		"""Yield the positions of the Rectangles that intersect the box 
+		(*x0*, *y0*, *x1*, *y1*), see Rectangle.intersects.
+		"""
+
+		return self._search(lambda bx0, by0, bx1, by1: 
+							bx0 < x1 and x0 < bx1 and by0 < y1 and y0 < by1)
+
+	def get_nearest(self, x, y, region=None):
+		"""Yield the positions of the Rectangles by their distance from 
+		the point (*x*, *y*), nearest first, and by position if they are
+		equally near. With a *region* (x0, y0, x1, y1), only those of 
+		the Rectangles that lie inside it.
+
+		The entries are visited best-first, so taking the first k 
+		positions only reads the nodes nearer than the k-th Rectangle.
+		"""
+
+		if not self.count:
+			return
+		boxes, indices, n = self._boxes, self._indices, self.count
+		if region is not None:
+			rx0, ry0, rx1, ry1 = region
+
+		def push(heap, entry):
+			x0, y0, x1, y1 = boxes[4 * entry:4 * entry + 4]
+			if region is not None:
+				if entry < n:
+					if not (rx0 <= x0 and x1 <= rx1 
+							and ry0 <= y0 and y1 <= ry1):
+						return
+				elif not (x0 <= rx1 and rx0 <= x1 
+							and y0 <= ry1 and ry0 <= y1):
+					return
+			distance = math.hypot(max(x0 - x, 0, x - x1), 
+									max(y0 - y, 0, y - y1))
+			heapq.heappush(heap, (distance, 
+							indices[entry] if entry < n else -1, entry))
+
+		heap = []
+		push(heap, len(indices) - 1)
+		while heap:
+			distance, position, entry = heapq.heappop(heap)
+			if entry < n:
+				yield position
+				continue
+			for child in self._get_children(entry):
+				push(heap, child)
+
+
+def _get_box_score(cloud, x, y, rect):
+	"""Rate placing Rectangle *rect* at (x, y) in RectangleCloud *cloud*
+	by the size of the resulting occupied rect, measured against the
+	cloud's aspect ratio. Lower is better.
+	"""
+
+	occ = cloud.get_occupied_rect()
+	w = max(occ.x + occ.w, x + rect.w) - min(occ.x, x)
+	h = max(occ.y + occ.h, y + rect.h) - min(occ.y, y)
+	return max(w, h * cloud.ratio), y, x
+
+
+class PlacementStrategy(object):
+	"""Decides where RectangleCloud.add_rect puts a Rectangle.
+
+	Strategies keep no state of their own, so one instance can serve
+	many clouds. State that has to survive between placements is kept 
+	in the cloud's *_placement_state* attribute, which is dropped 
+	whenever the cloud's rectangles are moved.
+	"""
+
+	def place(self, cloud, rect):
+		"""Set the coordinates of Rectangle *rect*, which is about to be
+		added to the non-empty RectangleCloud *cloud*, so it doesn't 
+		overlap any of the cloud's rectangles. Negative coordinates are
+		compensated for by the cloud.
+		"""
+
+		rect.x, rect.y = self.get_positions(cloud, rect, 1)[0]
+
+	def get_positions(self, cloud, rect, count):
+		"""Return up to *count* positions (x, y) for Rectangle *rect* in
+		the non-empty RectangleCloud *cloud*, best first.
+		"""
+
+		raise NotImplementedError
+
+	def key(self):
+		"""Return what sets the layouts of the strategy apart from those
+		of other strategies: the name of its class and its parameters, 
+		which are all the attributes it keeps. See LayoutCache.get_key.
+		"""
+
+		return (self.__class__.__name__,) + tuple(sorted(
+			self.__dict__.items()))
+
+	def get_positions_by_ratio(self, cloud, rect, ratios):
+		"""Return the best position (x, y) for Rectangle *rect* in the
+		non-empty RectangleCloud *cloud* for each of *ratios*, as if it
+		were the ratio of *cloud*.
+		"""
+
+		ratio = cloud.ratio
+		positions = []
+		try:
+			for r in ratios:
+				cloud.ratio = r
+				positions.append(self.get_positions(cloud, rect, 1)[0])
+		finally:
+			cloud.ratio = ratio
+		return positions
+
+
+def _get_best_positions(rated, count):
+	"""Return the positions of the *count* best rated candidates, given
+	as (rating, x, y) with lower ratings being better.
+	"""
+
+	positions = []
+	for rating, x, y in sorted(rated):
+		if (x, y) not in positions:
+			positions.append((x, y))
+			if len(positions) == count:
+				break
+	if not positions:
+		raise Exception("No candidates were found.")
+	return positions
+
+
+class SpotStrategy(PlacementStrategy):
+	"""Arrange into an ellipse-like shape by rating candidates in the
+	spots of empty space around the cloud. The default strategy.
+
+	With *vectorize* True, the candidates of all spots are made at once
+	by RectangleCloud.make_candidates_data_many, which needs NumPy and 
+	gives float positions.
+	"""
+
+	def __init__(self, vectorize=False):
+		self.vectorize = vectorize
+
+	def _get_candidates(self, cloud, rect):
+		candidates = set()
+
+		if self.vectorize:
+			candidates.update(cloud.make_candidates_data_many(
+				cloud.get_spots_for_rectangle(rect), rect))
+		else:
+			for sp in cloud.get_spots_for_rectangle(rect):
+				cands = cloud.make_candidates_data(sp, rect)
+				candidates.update(cands)
+
+		if not candidates:
+			raise Exception("No candidates were found.")
+		return candidates
+
+	def get_positions(self, cloud, rect, count):
+		candidates = self._get_candidates(cloud, rect)
+		rated = cloud.rate_candidates(candidates)
+		if count == 1:
+			choice = cloud.choose_best_candidate(rated)
+			return [(choice.x, choice.y)]
+
+		return _get_best_positions([(-ratio, c.x, c.y) for ratio, c in rated],
+									count)
+
+	def get_positions_by_ratio(self, cloud, rect, ratios):
+		## The spots and candidates don't depend on the ratio, only 
+		## their ratings do.
+		candidates = self._get_candidates(cloud, rect)
+		positions = []
+		for ratio in ratios:
+			choice = cloud.choose_best_candidate(
+						cloud.rate_candidates(candidates, ratio))
+			positions.append((choice.x, choice.y))
+		return positions
+
+
+class SkylineStrategy(PlacementStrategy):
+	"""Dense packing in O(s) per Rectangle for a skyline of s segments.
+
+	The skyline is the upper border of the packed rectangles, starting
+	at x == 0 and continuing at height 0 to the right. A Rectangle is 
+	put on top of the skyline at the start of a segment, where it keeps
+	the occupied rect smallest for the cloud's ratio, and lowest and 
+	leftmost on ties. Space below overhangs is never used again.
+	"""
+
+	def get_positions(self, cloud, rect, count):
+		xs, ys = self._get_skyline(cloud)
+
+		## The segments under the Rectangle at each start form a window
+		## sliding right. It keeps the ones that may still be highest in
+		## *window*, of falling heights, so each goes in and out once.
+		rated = []
+		window = collections.deque()
+		j = 0
+		for i, x in enumerate(xs):
+			while j < len(xs) and (j == i or xs[j] < x + rect.w):
+				while window and ys[window[-1]] <= ys[j]:
+					window.pop()
+				window.append(j)
+				j += 1
+			while window[0] < i:
+				window.popleft()
+			rated.append(_get_box_score(cloud, x, ys[window[0]], rect))
+
+		return [(x, y) for y, x in _get_best_positions(rated, count)]
+
+	def _get_skyline(self, cloud):
+		"""Return a copy of the skyline of *cloud*. Rectangles appended 
+		since it was last built are put on top of it.
+		"""
+
+		rects = cloud.get_rects()
+		state = cloud.__dict__.get("_placement_state")
+		if state and state[0] <= len(rects):
+			count, xs, ys = state
+			xs, ys = list(xs), list(ys)
+		else:
+			count, xs, ys = 0, [0], [0]
+			rects = sorted(rects, key=SORTKEYS[DIRECTION_UP])
+
+		if count < len(rects):
+			for r in rects[count:]:
+				if r:
+					self._raise_skyline(xs, ys, r)
+			cloud._placement_state = (len(rects), xs, ys)
+			xs, ys = list(xs), list(ys)
+		return xs, ys
+
+	def _raise_skyline(self, xs, ys, rect):
+		"""Set the skyline's height to the top of *rect* along its width."""
+
+		x0, x1 = max(rect.x, 0), rect.x + rect.w
+		if x1 <= x0:
+			return
+		i = bisect.bisect(xs, x0) - 1
+		j = bisect.bisect_left(xs, x1)
+		## Height of the skyline right of *rect*.
+		after = ys[j - 1]
+		if j < len(xs) and xs[j] == x1:
+			after = None
+		if xs[i] < x0:
+			i += 1
+		xs[i:j] = [x0] if after is None else [x0, x1]
+		ys[i:j] = [rect.y + rect.h] if after is None \
+					else [rect.y + rect.h, after]
+
+
+class MaxRectsStrategy(PlacementStrategy):
+	"""Dense packing into the maximal empty rectangles around the cloud
+	(see RectangleCloud.get_free_space). A Rectangle goes into the
+	corner of a fitting free rectangle that is nearest to the origin, 
+	where it keeps the occupied rect smallest for the cloud's ratio.
+	"""
+
+	def get_positions(self, cloud, rect, count):
+		rated = []
+		for f in cloud.get_free_space().get_fitting(rect.w, rect.h):
+			x = min(max(0, f.x), f.x + f.w - rect.w)
+			y = min(max(0, f.y), f.y + f.h - rect.h)
+			rated.append(_get_box_score(cloud, x, y, rect))
+
+		return [(x, y) for y, x in _get_best_positions(rated, count)]
+
+
+def _rate_layout(occ, area, ratio):
+	"""Rate a layout by how densely Rectangles of total *area* fill its
+	occupied rect *occ*, and by how close the aspect ratio of *occ* is
+	to *ratio*. Higher is better.
+	"""
+
+	if not occ:
+		return 0.0
+	aspect = occ.get_aspect_ratio() / ratio
+	return area / float(occ.get_area()) * min(aspect, 1 / aspect)
+
+
+def _expand_layout(cloud, rect, count):
+	"""Return up to *count* ratings and positions (rating, x, y) for 
+	Rectangle *rect* in RectangleCloud *cloud*, as a beam search step 
+	of RectangleCloud.arrange.
+	"""
+
+	if not cloud.get_rects() or not rect:
+		return [(0.0, 0, 0)]
+
+	area = sum(r.get_area() for r in cloud.get_rects()) + rect.get_area()
+	occ = cloud.get_occupied_rect()
+	expansions = []
+	for x, y in cloud.strategy.get_positions(cloud, rect, count):
+		grown = occ.get_union(Rectangle(x, y, rect.w, rect.h))
+		expansions.append((_rate_layout(grown, area, cloud.ratio), x, y))
+	return expansions
+
+
+def _write_array(f, typecode, values):
+	values = array.array(typecode, values)
+	if sys.byteorder == "big":
+		values.byteswap()
+	values.tofile(f)
+
+
+## The struct codes of the numbers that buffers may hold.
+_NUMBER_CODES = frozenset("bBhHiIlLqQfd")
+
+
+def _get_buffer_format(buf, typecode=None):
+	"""Return the struct format of the items of the buffer *buf* and 
+	their number. The type of the items is *typecode*, or else the 
+	typecode of an array.array, the dtype of a NumPy array or the format
+	of a memoryview. The items must be numbers, in C order without gaps.
+	"""
+
+	if typecode is None:
+		typecode = getattr(buf, "typecode", None)
+	if typecode is None:
+		dtype = getattr(buf, "dtype", None)
+		if dtype is not None:
+			if not dtype.isnative:
+				raise ValueError("Buffer is not in native byte order")
+			typecode = dtype.char
+		else:
+			typecode = getattr(buf, "format", None)
+	if typecode is None:
+		raise TypeError("Can't tell the item type of %r, pass a typecode" 
+						% type(buf))
+	fmt = typecode if typecode[0] in "@=<>!" else "@" + typecode
+	if fmt[1:] not in _NUMBER_CODES:
+		raise ValueError("Buffer items of type %r aren't numbers" 
+							% typecode)
+
+	flags = getattr(buf, "flags", None)
+	if flags is not None:
+		contiguous = flags["C_CONTIGUOUS"]
+	else:
+		## A memoryview has no flags, compare its strides with those 
+		## of C order. Dimensions of one item have any stride.
+		contiguous = True
+		stride = getattr(buf, "itemsize", 1)
+		shape = getattr(buf, "shape", None) or ()
+		strides = getattr(buf, "strides", None) or ()
+		for n, actual in reversed(zip(shape, strides)):
+			if n > 1 and actual != stride:
+				contiguous = False
+			stride *= n
+	if not contiguous:
+		raise ValueError("Buffer is not contiguous in C order")
+
+	nbytes = getattr(buf, "nbytes", None)
+	if nbytes is None:
+		nbytes = getattr(buf, "itemsize", 1)
+		for n in getattr(buf, "shape", None) or (len(buf),):
+			nbytes *= n
+	return fmt, nbytes // struct.calcsize(fmt)
+
+
+class _BufferArray(object):
+	"""The *count* little-endian items of struct format *code* at byte 
+	*offset* of the buffer *buf*, read like an array.array.
+	"""
+
+	def __init__(self, buf, offset, count, code):
+		self._buf = buf
+		self._offset = offset
+		self._count = count
+		self._code = code
+		self._item = struct.Struct("<" + code)
+
+	def __len__(self):
+		return self._count
+
+	def __iter__(self):
+		for i in xrange(self._count):
+			yield self[i]
+
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			start, stop, step = i.indices(self._count)
+			if step != 1:
+				return [self[j] for j in xrange(start, stop, step)]
+			return struct.unpack_from("<%i%s" % (max(stop - start, 0), 
+				self._code), self._buf, self._offset + self._item.size * start)
+		if i < 0:
+			i += self._count
+		if not 0 <= i < self._count:
+			raise IndexError("array index out of range")
+		return self._item.unpack_from(self._buf, 
+									self._offset + self._item.size * i)[0]
+
+
+class _BufferRectangles(object):
+	"""The *count* Rectangles of the buffer *buf*. A Rectangle is made 
+	when it is first accessed, and is the same object afterwards. Its 
+	x, y, w and h are the items of struct format *fmt* at the byte 
+	offsets in *columns*, plus *stride* bytes per Rectangle before it, 
+	or 0 for columns that are None.
+
+	With the byte offset *order* of a column of uint32 indexes, the 
+	Rectangles are in the order of the index.
+	"""
+
+	def __init__(self, buf, count, fmt, stride, columns, order=None, 
+					made=None):
+		self._buf = buf
+		self._count = count
+		self._item = struct.Struct(fmt)
+		self._stride = stride
+		self._columns = columns
+		self._order = order
+		self._made = {} if made is None else made
+
+	def get_ordered(self, order):
+		return self.__class__(self._buf, self._count, self._item.format,
+					self._stride, self._columns, order, self._made)
+
+	def __len__(self):
+		return self._count
+
+	def __iter__(self):
+		for i in xrange(self._count):
+			yield self[i]
+
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			return [self[j] for j in xrange(*i.indices(self._count))]
+		if i < 0:
+			i += self._count
+		if not 0 <= i < self._count:
+			raise IndexError("Rectangle index out of range")
+		if self._order is not None:
+			i, = struct.unpack_from("<I", self._buf, self._order + 4 * i)
+		r = self._made.get(i)
+		if r is None:
+			offset = self._stride * i
+			r = self._made[i] = Rectangle(*[
+				0 if c is None else 
+					self._item.unpack_from(self._buf, offset + c)[0]
+						for c in self._columns])
+		return r
+
+
+class _CrossedIntervals(object):
+	"""The vertical extents [y0, y1) of the Rectangles that the sweep 
+	line of RectangleCloud._iter_overlaps crosses, by their positions. 
+	Their edges are among the sorted distinct values *ys*. Adding or 
+	removing an extent takes O(log n), and finding the k that overlap 
+	another O(log n + k).
+
+	An extent overlaps another if it holds its lower edge, or starts 
+	above it, inside it. For the first, a segment tree over *ys* keeps 
+	each extent at the O(log n) nodes that cover it, so the ones that 
+	hold a point are at the nodes above the point's leaf. For the 
+	second, the lower edges are linked in order, with a tree of their 
+	counts to find the first one above a point.
+	"""
+
+	def __init__(self, ys):
+		self._edges = dict((y, i) for i, y in enumerate(ys))
+		size = 1
+		while size < len(ys):
+			size *= 2
+		self._size = size
+		self._cover = [None] * (2 * size)
+		self._counts = [0] * (2 * size)
+		self._starts = [None] * size
+		self._next = [None] * size
+		self._prev = [None] * size
+		self._last = None
+
+	def _get_cover(self, lo, hi):
+		"""Return the nodes that cover the leaves from *lo* to *hi*."""
+
+		nodes = []
+		lo += self._size
+		hi += self._size
+		while lo < hi:
+			if lo & 1:
+				nodes.append(lo)
+				lo += 1
+			if hi & 1:
+				hi -= 1
+				nodes.append(hi)
+			lo >>= 1
+			hi >>= 1
+		return nodes
+
+	def _find_start(self, leaf):
+		"""Return the first leaf from *leaf* on that lower edges are at,
+		or None.
+		"""
+
+		if leaf >= self._size:
+			return None
+		counts = self._counts
+		node = leaf + self._size
+		if counts[node]:
+			return leaf
+		while node > 1:
+			if not node & 1 and counts[node + 1]:
+				node += 1
+				break
+			node >>= 1
+		else:
+			return None
+		while node < self._size:
+			node = 2 * node if counts[2 * node] else 2 * node + 1
+		return node - self._size
+
+	def _count(self, leaf, change):
+		node = leaf + self._size
+		while node:
+			self._counts[node] += change
+			node >>= 1
+
+	def add(self, position, y0, y1):
+		lo, hi = self._edges[y0], self._edges[y1]
+		cover = self._cover
+		for node in self._get_cover(lo, hi):
+			if cover[node] is None:
+				cover[node] = set()
+			cover[node].add(position)
+
+		if not self._starts[lo]:
+			self._starts[lo] = set()
+			following = self._find_start(lo + 1)
+			preceding = self._last if following is None \
+						else self._prev[following]
+			self._next[lo], self._prev[lo] = following, preceding
+			if preceding is not None:
+				self._next[preceding] = lo
+			if following is None:
+				self._last = lo
+			else:
+				self._prev[following] = lo
+		self._starts[lo].add(position)
+		self._count(lo, 1)
+
+	def remove(self, position, y0, y1):
+		lo, hi = self._edges[y0], self._edges[y1]
+		for node in self._get_cover(lo, hi):
+			self._cover[node].discard(position)
+
+		starts = self._starts[lo]
+		starts.discard(position)
+		if not starts:
+			following, preceding = self._next[lo], self._prev[lo]
+			if preceding is not None:
+				self._next[preceding] = following
+			if following is None:
+				self._last = preceding
+			else:
+				self._prev[following] = preceding
+		self._count(lo, -1)
+
+	def get_overlapping(self, y0, y1):
+		"""Return the positions of the extents that overlap [y0, y1)."""
+
+		lo, hi = self._edges[y0], self._edges[y1]
+		found = []
+		node = lo + self._size
+		while node:
+			if self._cover[node]:
+				found.extend(self._cover[node])
+			node >>= 1
+		leaf = self._find_start(lo + 1)
+		while leaf is not None and leaf < hi:
+			found.extend(self._starts[leaf])
+			leaf = self._next[leaf]
+		return found
+
+
+def _arrange_shard((sizes, ratio, spots, strategy)):
+	"""Arrange the Rectangles of *sizes*, an array of w and h, as a 
+	shard of RectangleCloud.arrange_sharded. Return an array of their x 
+	and y, relative to the occupied rect, and its w and h. Runs in 
+	worker processes.
+	"""
+
+	cloud = RectangleCloud([Rectangle(0, 0, w, h) 
+							for w, h in zip(sizes[0::2], sizes[1::2])], 
+							ratio, spots, strategy)
+	cloud.arrange()
+	rects = cloud.get_rects()
+	if not rects:
+		return array.array("d"), (0, 0)
+	occ = cloud.get_occupied_rect()
+	return (array.array("d", [c for r in rects 
+								for c in (r.x - occ.x, r.y - occ.y)]),
+			(occ.w, occ.h))
+
+
+class RectangleCloud(object):
+	"""For arranging Rectangles into an ellipse-like shape."""
+	
+	_SORTED_DIRECTION_FMT = "_sdir_cache_%s"
+
+	## The seed points and their gaps of each direction, see 
+	## self.get_spots_for_rectangle.
+	_SEED_CACHES = map("_seeds_cache_%s".__mod__, range(4)) \
+					+ map("_gaps_cache_%s".__mod__, range(4))
+
+	## Derived state that clones share.
+	_CACHES = map(_SORTED_DIRECTION_FMT.__mod__, range(4)) + [
+				"_occupied_rect", "_free_space", "_placement_state", 
+				"_index"] + _SEED_CACHES + ["_spot_cache"]
+
+	## Whether self.get_spots_for_rectangle skips the seed points whose 
+	## gap is too small for the Rectangle, and the numbers of seed 
+	## points it skipped and searched.
+	prune_seeds = True
+	seeds_pruned = 0
+	seeds_searched = 0
+
+	## Whether self.get_spots_for_rectangle keeps the spots of the last
+	## size it searched for the next Rectangle of that size, see 
+	## self._trim_spots, and how often it did.
+	reuse_spots = False
+	spots_reused = 0
+
+	## Whether *_rects* is shared with a clone, and how many of the 
+	## Rectangles at its start belong to the cloud it is a clone of.
+	_shared_list = False
+	_shared_rects = 0
+
+	## The clones that share the Rectangles of the cloud, in a WeakSet.
+	_lent = None
+
+	## Changes recorded since the first open savepoint.
+	_journal = None
+
+	## The CloudRectangle of the cloud, see CloudRectangle.
+	_owner = None
+
+	## Callables that are told about changes, see self.subscribe.
+	_observers = ()
+
+	## The positions of Rectangles in *_rects* by their ids, maybe out
+	## of date, see self._index_of.
+	_positions = None
+
+	## What isn't pickled: caches that are quick to rebuild, and what
+	## only makes sense in this process.
+	_UNPICKLED = frozenset(_CACHES[:4] + _SEED_CACHES + ["_index", 
+				"_spot_cache", "_checkpoint", 
+				"_journal", "_observers", "_owner", "_shared_list", 
+				"_shared_rects", "_lent", "_positions"])
+
+	def __init__(self, rectangles=[], ratio=1.0, spots=SPOTS_SEEDS,
+					strategy=None):
+		self._rects = list(rectangles)
+		self.ratio = ratio
+		self.spots = spots
+		self.strategy = strategy or SpotStrategy()
+
+	def __contains__(self, obj):
+		return obj in self._rects
+
+	def __getstate__(self):
+		"""Pickle plain Rectangles, without attributes of their own, as 
+		one array of their x, y, w and h, and leave out the state named 
+		in self._UNPICKLED. The free space and placement state are kept,
+		they are slow to rebuild.
+		"""
+
+		state = dict((name, value) for name, value in self.__dict__.items()
+						if name not in self._UNPICKLED)
+		if all(type(r) is Rectangle and (len(r.__dict__) == 4 
+					or not r.__getstate__()) for r in self._rects):
+			coords = [c for r in self._rects for c in r]
+			typecode = all(type(c) is int for c in coords) and "l" or "d"
+			state["_rects"] = array.array(typecode, coords)
+		return state
+
+	def __setstate__(self, state):
+		rects = state.get("_rects")
+		if isinstance(rects, array.array):
+			coords = iter(rects)
+			state["_rects"] = [Rectangle(*xywh) 
+								for xywh in zip(*(coords,) * 4)]
+		self.__dict__.update(state)
+
+	def clone(self):
+		"""Return a copy of the cloud in O(1). The copy shares the 
+		Rectangles, caches and indexes with this cloud. Only the copy
+		copies the Rectangles, once, when either cloud is about to 
+		change them, so this cloud keeps its own. Rectangles changed 
+		directly, not through a cloud, change in both.
+		"""
+
+		other = self.__class__((), self.ratio, self.spots, self.strategy)
+		for name in self._CACHES:
+			if name in self.__dict__:
+				other.__dict__[name] = self.__dict__[name]
+		free = self.__dict__.get("_free_space")
+		if free is not None:
+			other._free_space = free.copy()
+
+		other._rects = self._rects
+		self._shared_list = other._shared_list = True
+		other._shared_rects = len(self._rects)
+		if self._lent is None:
+			self._lent = weakref.WeakSet()
+		self._lent.add(other)
+		return other
+
+	def _own_list(self):
+		"""Copy *_rects* if it is shared with a clone or is read from a 
+		buffer (see self.load and self.from_buffer).
+		"""
+
+		if self._shared_list or not isinstance(self._rects, list):
+			self._rects = list(self._rects)
+			self._shared_list = False
+
+	def _own_rects(self):
+		"""Before the cloud changes its Rectangles, have its clones copy
+		them, and copy those it shares with the cloud it is a clone of.
+		"""
+
+		for other in list(self._lent or ()):
+			other._own_rects()
+		n = self._shared_rects
+		if n:
+			self._own_list()
+			if self._journal is not None:
+				## The sorted lists that a rollback restores hold the 
+				## shared Rectangles, so it must put them back too.
+				self._journal.append((JOURNAL_ATTRS, 
+					dict(_rects=self._rects[:], _shared_rects=n)))
+			self._rects[:n] = [r.clone() for r in self._rects[:n]]
+			self._shared_rects = 0
+			## The sorted lists hold the Rectangles of the clone.
+			for direction in range(4):
+				self.__dict__.pop(self._SORTED_DIRECTION_FMT % direction, None)
+
+	def save(self, path, indexes=True):
+		"""Write the Rectangles and settings of the cloud to the file 
+		*path*, with the sorted lists and the RectangleIndex of the 
+		cloud if *indexes* is True. See self.load.
+		"""
+
+		rects = self._rects
+		with open(path, "wb") as f:
+			f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+				indexes and SNAPSHOT_INDEXES | SNAPSHOT_RTREE or 0, 
+				len(rects), self.ratio, self.spots))
+			for name in ("x", "y", "w", "h"):
+				_write_array(f, "d", [getattr(r, name) for r in rects])
+			if indexes and rects:
+				positions = dict((id(r), i) for i, r in enumerate(rects))
+				for direction in range(4):
+					s = self._get_sorted_DIRECTION(direction, 
+													SORTKEYS[direction])
+					_write_array(f, _UINT32, [positions[id(r)] for r in s])
+				self.get_index()._save(f)
+
+	def publish(self, path):
+		"""Save the cloud with its indexes to the file *path* for 
+		SharedClouds. The file is replaced, not written over, so the 
+		SharedClouds that attached it before keep reading the old one 
+		until they are refreshed. Windows can't replace a file that is 
+		open, though.
+		"""
+
+		temp = "%s.%i.tmp" % (path, os.getpid())
+		self.save(temp)
+		try:
+			if os.name == "nt" and os.path.exists(path):
+				os.remove(path)
+			os.rename(temp, path)
+		except OSError:
+			os.remove(temp)
+			raise
+
+	@classmethod
+	def load(cls, path, strategy=None):
+		"""Return the cloud saved to the file *path* by self.save.
+
+		The file is memory-mapped, and a Rectangle is only made when it 
+		is first accessed. The first change to the list of Rectangles 
+		makes all of them. Coordinates and sizes are loaded as floats.
+		The sorted lists and the RectangleIndex are read from the file 
+		too, until the cloud changes.
+		"""
+
+		with open(path, "rb") as f:
+			buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		if len(buf) < _SNAPSHOT_HEADER.size:
+			raise ValueError("Not a RectangleCloud snapshot: %r" % path)
+		magic, version, flags, count, ratio, spots = \
+			_SNAPSHOT_HEADER.unpack_from(buf)
+		if magic != SNAPSHOT_MAGIC:
+			raise ValueError("Not a RectangleCloud snapshot: %r" % path)
+		if version > SNAPSHOT_VERSION:
+			raise ValueError("Unsupported snapshot version %i: %r" 
+								% (version, path))
+
+		size = _SNAPSHOT_HEADER.size + 32 * count
+		if flags & SNAPSHOT_INDEXES and count:
+			size += 16 * count
+			if flags & SNAPSHOT_RTREE:
+				saved = RectangleIndex._get_saved_size(buf, size)
+				if saved is None or saved[1] != count:
+					raise ValueError("Broken index in snapshot: %r" % path)
+				size += saved[0]
+		if len(buf) != size:
+			raise ValueError("Snapshot of %i Rectangles has %i bytes, "
+					"not %i: %r" % (count, len(buf), size, path))
+
+		offset = _SNAPSHOT_HEADER.size
+		cloud = cls((), ratio, spots, strategy)
+		cloud._rects = rects = _BufferRectangles(buf, count, "<d", 8,
+							[offset + 8 * count * c for c in range(4)])
+		if flags & SNAPSHOT_INDEXES and count:
+			offset = _SNAPSHOT_HEADER.size + 32 * count
+			for direction in range(4):
+				cloud.__dict__[cls._SORTED_DIRECTION_FMT % direction] = \
+					rects.get_ordered(offset + 4 * count * direction)
+			if flags & SNAPSHOT_RTREE:
+				cloud._index = RectangleIndex._load(buf, offset + 16 * count)
+		return cloud
+
+	@classmethod
+	def from_buffer(cls, xywh, typecode=None, ratio=1.0, 
+					spots=SPOTS_SEEDS, strategy=None):
+		"""Return a cloud of the Rectangles whose x, y, w and h are the 
+		rows of the buffer *xywh*, of four numbers each. For the type of
+		the numbers see self.from_sizes.
+		"""
+
+		return cls._from_buffer(xywh, typecode, (0, 1, 2, 3), 
+								ratio, spots, strategy)
+
+	@classmethod
+	def from_sizes(cls, wh, typecode=None, ratio=1.0, spots=SPOTS_SEEDS,
+					strategy=None):
+		"""Return a cloud of the Rectangles at (0, 0) whose w and h are 
+		the rows of the buffer *wh*, of two numbers each. The numbers 
+		are of the type of the typecode of an array.array, the dtype of
+		a NumPy array or the format of a memoryview, or else of the 
+		struct *typecode*.
+
+		The buffer isn't copied. As with self.load, a Rectangle is read 
+		from it when it is first accessed, so it must not change until 
+		then.
+		"""
+
+		return cls._from_buffer(wh, typecode, (None, None, 0, 1), 
+								ratio, spots, strategy)
+
+	@classmethod
+	def _from_buffer(cls, buf, typecode, columns, ratio, spots, strategy):
+		fmt, count = _get_buffer_format(buf, typecode)
+		size = struct.calcsize(fmt)
+		width = len(columns) - columns.count(None)
+		shape = getattr(buf, "shape", None) or ()
+		if count % width or len(shape) > 1 and shape[-1] != width:
+			raise ValueError("Buffer of %i items has no rows of %i" 
+								% (count, width))
+		cloud = cls((), ratio, spots, strategy)
+		cloud._rects = _BufferRectangles(buf, count // width, fmt, 
+			size * width, [c if c is None else c * size for c in columns])
+		return cloud
+
+	def write_positions(self, out, typecode=None):
+		"""Write the x and y of the Rectangles, in their order, as rows 
+		of two numbers into the buffer *out*, and return it. For the 
+		type of the numbers see self.from_sizes.
+		"""
+
+		fmt, count = _get_buffer_format(out, typecode)
+		if count < 2 * len(self._rects):
+			raise ValueError("Buffer of %i items can't hold %i positions"
+								% (count, len(self._rects)))
+		item = struct.Struct(fmt)
+		offset = 0
+		for r in self._rects:
+			item.pack_into(out, offset, r.x)
+			item.pack_into(out, offset + item.size, r.y)
+			offset += 2 * item.size
+		return out
+
+	def savepoint(self):
+		"""Start recording the changes made to the cloud. Return a 
+		savepoint to pass to self.rollback or self.release. Savepoints
+		nest.
+		"""
+
+		if self._journal is None:
+			self._journal = []
+		return len(self._journal)
+
+	def rollback(self, savepoint):
+		"""Undo the changes made since *savepoint*, in time proportional
+		to them. *savepoint* and the ones after it are still open.
+		"""
+
+		journal = self._journal
+		if journal is None or savepoint > len(journal):
+			raise ValueError("Unknown savepoint %r" % savepoint)
+
+		undo, journal[savepoint:] = journal[savepoint:], []
+		self._journal = None
+		try:
+			for entry in reversed(undo):
+				self._undo(entry)
+		finally:
+			self._journal = journal
+			self._notify_owner()
+
+	def release(self, savepoint):
+		"""Keep the changes made since *savepoint*. Recording stops when 
+		the first savepoint is released.
+		"""
+
+		if self._journal is None or savepoint > len(self._journal):
+			raise ValueError("Unknown savepoint %r" % savepoint)
+		if not savepoint:
+			self._journal = None
+
+	def _record_attrs(self, *names):
+		if self._journal is not None:
+			self._journal.append((JOURNAL_ATTRS,
+				dict((n, self.__dict__.get(n, _MISSING)) for n in names)))
+
+	def _undo(self, entry):
+		kind = entry[0]
+		if kind == JOURNAL_APPEND:
+			self._own_list()
+			rect = self._rects.pop()
+			if self._observers:
+				self._emit(EVENT_REMOVE, rect, rect.x, rect.y)
+		elif kind == JOURNAL_MOVE:
+			self.move_all(-entry[1], -entry[2])
+		elif kind == JOURNAL_FREE:
+			entry[1].revert(entry[2])
+		elif kind == JOURNAL_ATTRS:
+			for name, value in entry[1].items():
+				if value is _MISSING:
+					self.__dict__.pop(name, None)
+				else:
+					self.__dict__[name] = value
+		elif kind == JOURNAL_ARRANGE:
+			rects, coords = entry[1:]
+			for r, (x, y) in zip(rects, coords):
+				r.x, r.y = x, y
+			self._rects = rects
+			self._shared_list = False
+			self._emit_placed()
+		elif kind == JOURNAL_REMOVE:
+			i, rect = entry[1:]
+			self._own_list()
+			self._rects.insert(i, rect)
+			if self._observers:
+				self._emit(EVENT_ADD, rect, rect.x, rect.y)
+		elif kind == JOURNAL_RESIZE:
+			rect, rect.w, rect.h = entry[1:]
+			if self._observers:
+				self._emit(EVENT_RESIZE, rect, rect.w, rect.h)
+
+	def move_all(self, x=0, y=0):
+		if not x and not y:
+			return
+		self._own_rects()
+		self._record_attrs("_placement_state", "_occupied_rect", "_index",
+					"_spot_cache", *self._CACHES[:4] + self._SEED_CACHES)
+		if self._journal is not None:
+			self._journal.append((JOURNAL_MOVE, x, y))
+		free = self.__dict__.get("_free_space")
+		if free is not None:
+			free.move(x, y)
+		self.__dict__.pop("_placement_state", None)
+		self.__dict__.pop("_index", None)
+		self.__dict__.pop("_spot_cache", None)
+		for name in self._SEED_CACHES:
+			self.__dict__.pop(name, None)
+		occ = self.__dict__.get("_occupied_rect")
+		if occ is not None:
+			self._occupied_rect = Rectangle(occ.x + x, occ.y + y, occ.w, occ.h)
+		if x:
+			for r in self._rects:
+				r.x += x
+		if y:
+			for r in self._rects:
+				r.y += y
+		if self._observers:
+			self._emit(EVENT_MOVE, None, x, y)
+
+	def get_sorted_left(self):
+		return self._get_sorted_DIRECTION(DIRECTION_LEFT, 
+										SORTKEYS[DIRECTION_LEFT])
+
+	def get_sorted_lower(self):
+		return self._get_sorted_DIRECTION(DIRECTION_DOWN, 
+										SORTKEYS[DIRECTION_DOWN])
+
+	def get_sorted_right(self):
+		return self._get_sorted_DIRECTION(DIRECTION_RIGHT,
+										SORTKEYS[DIRECTION_RIGHT])
+
+	def get_sorted_upper(self):
+		return self._get_sorted_DIRECTION(DIRECTION_UP, 
+										SORTKEYS[DIRECTION_UP])
+
+	def _get_sorted_DIRECTION(self, direction, sortkey):
+		attrname = self._SORTED_DIRECTION_FMT % direction
+		if not getattr(self, attrname, None) and self._rects:
+			setattr(self, attrname, sorted(self._rects, key=sortkey))
+		return getattr(self, attrname)
+
+	def _invalidate(self):
+		for direction in (DIRECTION_LEFT, DIRECTION_RIGHT,
+							DIRECTION_UP, DIRECTION_DOWN):
+			self.__dict__.pop(self._SORTED_DIRECTION_FMT % direction, None)
+		self.__dict__.pop("_occupied_rect", None)
+		self.__dict__.pop("_index", None)
+		self._record_attrs("_spot_cache", *self._SEED_CACHES)
+		self.__dict__.pop("_spot_cache", None)
+		for name in self._SEED_CACHES:
+			self.__dict__.pop(name, None)
+		self._notify_owner()
+
+	def _notify_owner(self):
+		if self._owner is not None:
+			self._owner._changed()
+
+	def subscribe(self, observer):
+		"""Call *observer* with (event, rect, a, b) after each change of
+		the layout, so it can follow the layout without reading all 
+		Rectangles again:
+
+		EVENT_ADD: Rectangle *rect* was added at (*a*, *b*), or was put 
+		there by self.arrange or self.rollback. An arrange tells of each
+		Rectangle once, at its end.
+		EVENT_MOVE: all Rectangles moved by (*a*, *b*); *rect* is None.
+		EVENT_REMOVE: *rect* was removed from (*a*, *b*).
+		EVENT_RESIZE: *rect* was resized to width *a* and height *b*.
+
+		Clones don't inherit observers, and Rectangles shared with a 
+		clone are copied before the cloud changes them, see self.clone.
+		Return *observer*.
+		"""
+
+		self._observers = self._observers + (observer,)
+		return observer
+
+	def unsubscribe(self, observer):
+		"""Stop calling *observer*."""
+
+		observers = list(self._observers)
+		observers.remove(observer)
+		self._observers = tuple(observers)
+
+	def _emit(self, event, rect, a, b):
+		for observer in self._observers:
+			observer(event, rect, a, b)
+
+	def _emit_placed(self):
+		if self._observers:
+			for r in self._rects:
+				self._emit(EVENT_ADD, r, r.x, r.y)
+
+	def get_rectangles(self):
+		return self._rects
+	get_rects = get_rectangles
+
+	def get_occupied_rect(self):
+		try:
+			return self._occupied_rect
+		except AttributeError:
+			left = self.get_sorted_left()[0]
+			lower = self.get_sorted_lower()[0]
+			right = self.get_sorted_right()[-1]
+			upper = self.get_sorted_upper()[-1]
+			self._occupied_rect = Rectangle(
+				left.x,
+				lower.y,
+				right.x + right.w - left.x,
+				upper.y + upper.h - lower.y
+			)
+		return self._occupied_rect
+
+	def get_free_space(self):
+		"""Return the MaximalRectangles of the empty space inside and
+		around the cloud. Rectangles appended to the cloud since the 
+		last call are carved out incrementally.
+		"""
+
+		free = self.__dict__.get("_free_space")
+		if free is None or free.count > len(self._rects):
+			self._record_attrs("_free_space")
+			free = self._free_space = MaximalRectangles()
+		for r in self._rects[free.count:]:
+			change = free.add(r)
+			if self._journal is not None:
+				self._journal.append((JOURNAL_FREE, free, change))
+		return free
+
+	def get_index(self):
+		"""Return the RectangleIndex of the Rectangles of the cloud. It
+		is built again after they changed.
+		"""
+
+		index = self.__dict__.get("_index")
+		if index is None or len(index) != len(self._rects):
+			self._record_attrs("_index")
+			index = self._index = RectangleIndex(self._rects)
+		return index
+
+	def hit_test(self, x, y):
+		"""Return the Rectangle that contains the point (*x*, *y*), the 
+		last one in the cloud if several do, or None. See 
+		RectangleIndex.get_containing.
+		"""
+
+		positions = list(self.get_index().get_containing(x, y))
+		return positions and self._rects[max(positions)] or None
+
+	def hit_test_many(self, points):
+		"""Return the Rectangles that contain the *points* (x, y), see 
+		self.hit_test.
+		"""
+
+		rects = self._rects
+		get_containing = self.get_index().get_containing
+		hits = []
+		for x, y in points:
+			positions = list(get_containing(x, y))
+			hits.append(positions and rects[max(positions)] or None)
+		return hits
+
+	def nearest(self, point, k=1):
+		"""Return the *k* Rectangles nearest to *point* (x, y), nearest 
+		first. The distance to a Rectangle is that to its nearest point,
+		0 inside of it.
+		"""
+
+		x, y = point
+		return [self._rects[i] for i in 
+				itertools.islice(self.get_index().get_nearest(x, y), k)]
+
+	def nearest_in_direction(self, rect, direction, k=1):
+		"""Return the *k* Rectangles nearest to the center of Rectangle
+		*rect*, of those that lie past its edge in *direction*, one of 
+		DIRECTION_UP, DIRECTION_DOWN, DIRECTION_LEFT and DIRECTION_RIGHT,
+		nearest first.
+		"""
+
+		far = float("inf")
+		region = {
+			DIRECTION_UP: (-far, rect.y + rect.h, far, far),
+			DIRECTION_DOWN: (-far, -far, far, rect.y),
+			DIRECTION_LEFT: (-far, -far, rect.x, far),
+			DIRECTION_RIGHT: (rect.x + rect.w, -far, far, far),
+		}[direction]
+		nearest = (self._rects[i] for i in self.get_index().get_nearest(
+			rect.x + rect.w / 2.0, rect.y + rect.h / 2.0, region))
+		return list(itertools.islice(
+						(r for r in nearest if r is not rect), k))
+
+	def iter_viewport(self, viewport):
+		"""Yield the Rectangles that intersect Rectangle *viewport*, tile
+		by tile.
+		"""
+
+		rects = self._rects
+		for i in self.get_index().get_intersecting(viewport.x, viewport.y,
+				viewport.x + viewport.w, viewport.y + viewport.h):
+			yield rects[i]
+
+	def get_viewport_delta(self, previous, viewport):
+		"""Return the lists of Rectangles that intersect Rectangle 
+		*viewport* but not Rectangle *previous*, and those that 
+		intersect *previous* but not *viewport*. A *previous* of None 
+		intersects nothing.
+
+		Only the parts of either viewport outside of the other are 
+		searched, so the cost follows the Rectangles that come and go.
+		"""
+
+		return (self._get_viewport_entered(previous, viewport), 
+				self._get_viewport_entered(viewport, previous))
+
+	def _get_viewport_entered(self, previous, viewport):
+		if viewport is None:
+			return []
+		if previous is None or not previous.intersects(viewport):
+			return list(self.iter_viewport(viewport))
+
+		rects, index = self._rects, self.get_index()
+		ax0, ay0 = viewport.x, viewport.y
+		ax1, ay1 = ax0 + viewport.w, ay0 + viewport.h
+		bx0, by0 = previous.x, previous.y
+		bx1, by1 = bx0 + previous.w, by0 + previous.h
+		## The parts of *viewport* outside of *previous*.
+		strips = [(ax0, ay0, bx0, ay1), (bx1, ay0, ax1, ay1),
+				(max(ax0, bx0), ay0, min(ax1, bx1), by0),
+				(max(ax0, bx0), by1, min(ax1, bx1), ay1)]
+		entered = []
+		seen = set()
+		for x0, y0, x1, y1 in strips:
+			if x0 >= x1 or y0 >= y1:
+				continue
+			for i in index.get_intersecting(x0, y0, x1, y1):
+				if i not in seen:
+					seen.add(i)
+					if not rects[i].intersects(previous):
+						entered.append(rects[i])
+		return entered
+
+	def _iter_overlaps(self):
+		"""Yield the pairs of positions of intersecting Rectangles, 
+		found by a sweep line from left to right. The vertical extents 
+		of the Rectangles that the line crosses are kept in a 
+		_CrossedIntervals, which finds those that a Rectangle overlaps.
+		Float Rectangles that overlap by no more than ROUNDING of the 
+		size of the coordinates on an axis touch, see _is_sliver.
+		"""
+
+		rects = self._rects
+		if not rects:
+			return
+		slack = ROUNDING * max(max(abs(r.x), abs(r.y), abs(r.x + r.w), 
+									abs(r.y + r.h)) for r in rects)
+		crossed = _CrossedIntervals(sorted(set(y for r in rects 
+												for y in (r.y, r.y + r.h))))
+		ends = []		# heap of (right edge, position)
+		for i in sorted(range(len(rects)), key=lambda i: rects[i].x):
+			r = rects[i]
+			while ends and ends[0][0] <= r.x:
+				j = heapq.heappop(ends)[1]
+				crossed.remove(j, rects[j].y, rects[j].y + rects[j].h)
+			for j in crossed.get_overlapping(r.y, r.y + r.h):
+				if r.intersects(rects[j]) and \
+						not _is_sliver(r, rects[j], slack):
+					yield (j, i) if j < i else (i, j)
+			crossed.add(i, r.y, r.y + r.h)
+			heapq.heappush(ends, (r.x + r.w, i))
+
+	def find_overlaps(self):
+		"""Return the pairs of Rectangles of the cloud that intersect,
+		in O(n log n + k) for k pairs. The earlier one in the cloud 
+		comes first in a pair.
+		"""
+
+		rects = self._rects
+		return [(rects[i], rects[j]) for i, j in self._iter_overlaps()]
+
+	def is_valid(self):
+		"""Whether no two Rectangles of the cloud intersect. Stops at 
+		the first pair that does.
+		"""
+
+		for pair in self._iter_overlaps():
+			return False
+		return True
+
+	def get_selection_by_rect(self, selector):
+		return select_by_rect(self._rects, selector)
+
+	def add_rect(self, rect, position=None):
+		"""Add Rectangle *rect* to the cloud and find a 
+		non-overlapping spot for it amongst the other 
+		rectangles. 
+		
+		A *position* (x, y), as found by self.strategy.get_positions, 
+		is used instead of searching again.
+		"""
+
+		rect.x, rect.y = 0, 0		# placement of rect is totally automatic
+		self._own_list()
+		if not self._rects or not rect:
+			self._append(rect)
+			return
+
+		self._record_attrs("_placement_state", "_index", *self._CACHES[:5])
+		if position is None:
+			self.strategy.place(self, rect)
+		else:
+			rect.x, rect.y = position
+		occ = self.get_occupied_rect().get_union(rect)
+		spot_cache = self.__dict__.get("_spot_cache")
+
+		self._append(rect)
+
+		## Compensate for negative coordinates
+		dx, dy = rect.x < 0 and -rect.x or 0, rect.y < 0 and -rect.y or 0
+		self.move_all(dx, dy)
+		self._invalidate()
+
+		## The occupied rect only grows by *rect*, no need to sort again.
+		occ.x += dx
+		occ.y += dy
+		self._occupied_rect = occ
+
+		if spot_cache is not None and spot_cache[0] == (rect.w, rect.h):
+			self._spot_cache = (spot_cache[0], 
+								self._trim_spots(spot_cache[1], rect, dx, dy, 
+												occ))
+
+	def _append(self, rect):
+		if self._journal is not None:
+			self._journal.append((JOURNAL_APPEND,))
+		self._rects.append(rect)
+		if self._positions is not None:
+			self._positions[id(rect)] = len(self._rects) - 1
+		if isinstance(rect, CloudRectangle):
+			rect.parent = self._owner
+		self._notify_owner()
+		if self._observers:
+			self._emit(EVENT_ADD, rect, rect.x, rect.y)
+
+	def _index_of(self, rect):
+		"""Return the position of Rectangle *rect* in the cloud. The 
+		positions by id are checked, and found again when they are out 
+		of date, after a Rectangle before *rect* was removed.
+		"""
+
+		rects = self._rects
+		if self._positions is not None:
+			i = self._positions.get(id(rect))
+			if i is not None and i < len(rects) and rects[i] is rect:
+				return i
+		self._positions = dict((id(r), i) for i, r in enumerate(rects))
+		i = self._positions.get(id(rect))
+		if i is None:
+			raise ValueError("%r is not in the cloud" % (rect,))
+		return i
+
+	def remove_rect(self, rect):
+		"""Remove Rectangle *rect* from the cloud. The others stay where
+		they are.
+		"""
+
+		i = self._index_of(rect)
+		self._record_attrs(*self._CACHES)
+		if self._journal is not None:
+			self._journal.append((JOURNAL_REMOVE, i, rect))
+		self._own_list()
+		del self._rects[i]
+		self._invalidate()
+		## The free space and placement state can't forget a Rectangle.
+		self.__dict__.pop("_free_space", None)
+		self.__dict__.pop("_placement_state", None)
+		if self._observers:
+			self._emit(EVENT_REMOVE, rect, rect.x, rect.y)
+
+	def resize_rect(self, rect, w, h):
+		"""Make Rectangle *rect* of the cloud *w* wide and *h* high, 
+		keeping its x and y. If it overlaps other Rectangles then, it is
+		removed and added again, at the end of the cloud.
+		
+		Return the Rectangle, which is a copy of *rect* if that was 
+		shared with a clone.
+		"""
+
+		i = self._index_of(rect)
+		self._own_rects()
+		rect = self._rects[i]
+		self._record_attrs(*self._CACHES)
+		if self._journal is not None:
+			self._journal.append((JOURNAL_RESIZE, rect, rect.w, rect.h))
+		rect.w, rect.h = w, h
+		self._refit(rect)
+		return rect
+
+	def refit_rect(self, rect):
+		"""Follow Rectangle *rect* of the cloud to the size it changed 
+		to by itself, as a CloudRectangle does when its cloud changes. 
+		If it overlaps other Rectangles then, it is removed and added 
+		again, at the end of the cloud. The others stay where they are.
+		"""
+
+		self._record_attrs(*self._CACHES)
+		self._refit(rect)
+
+	def _refit(self, rect):
+		self._invalidate()
+		self.__dict__.pop("_free_space", None)
+		self.__dict__.pop("_placement_state", None)
+		if self._observers:
+			self._emit(EVENT_RESIZE, rect, rect.w, rect.h)
+
+		if any(r is not rect for r in select_by_rect(self._rects, rect)):
+			self.remove_rect(rect)
+			self.add_rect(rect)
+
+	def get_checkpoint(self):
+		"""Return the LayoutCheckpoint of the last greedy arrange, or 
+		None.
+		"""
+
+		return self.__dict__.get("_checkpoint")
+
+	def arrange(self, beam=1, timeout=None, cache=None, warm=None):
+		"""Add all Rectangles of the cloud again, in their order.
+
+		With a *beam* width above 1, the *beam* best rated partial 
+		layouts are kept after each step, and each is extended by the 
+		*beam* best positions of the next Rectangle, one layout after 
+		another in this process. Once *timeout* seconds have passed, the
+		best rated partial layout is finished greedily.
+
+		With a LayoutCache *cache*, the layout of Rectangles of the same
+		sizes, in the same order and with the same settings is taken 
+		from the cache if it is there, and stored in it otherwise, 
+		unless *timeout* cut it short.
+
+		A greedy arrange (a *beam* of 1) leaves a LayoutCheckpoint, see
+		self.get_checkpoint. With *warm* True, or a LayoutCheckpoint 
+		*warm*, the Rectangles that the checkpoint's layout was made of 
+		are put back where they were if they are still at the start of 
+		the cloud, and only the ones after them are added again.
+		"""
+
+		self._own_rects()
+		if self._journal is not None:
+			self._record_attrs("_checkpoint", *self._CACHES)
+			self._journal.append((JOURNAL_ARRANGE, self._rects,
+									[(r.x, r.y) for r in self._rects]))
+
+		if cache is not None:
+			key = cache.get_key(self, beam)
+			positions = cache.get(key)
+			if positions is not None:
+				self._set_positions(positions)
+				if beam <= 1:
+					self._checkpoint = LayoutCheckpoint(self)
+				return
+
+		rects = self._rects[:]
+		self._rects = []
+		self._shared_list = False
+		self._invalidate()
+		self.__dict__.pop("_free_space", None)
+		self.__dict__.pop("_placement_state", None)
+		## Observers hear of each Rectangle once, where it ends up, not
+		## of every add and move on the way.
+		observers, self._observers = self._observers, ()
+		try:
+			complete = True
+			if beam > 1:
+				complete = self._arrange_beam(rects, beam, timeout)
+			else:
+				if warm is True:
+					warm = self.get_checkpoint()
+				start = 0
+				if warm is not None and warm.is_prefix_of(self, rects):
+					start = len(warm.sizes)
+					self._rects = rects[:start]
+					warm.restore(self)
+				for r in rects[start:]:
+					self.add_rect(r)
+				self._checkpoint = LayoutCheckpoint(self)
+		finally:
+			self._observers = observers
+		self._emit_placed()
+
+		if cache is not None and complete:
+			cache.put(key, [(r.x, r.y) for r in self._rects])
+
+	def arrange_sharded(self, shard_size=SHARD_SIZE, processes=None):
+		"""Arrange the Rectangles of the cloud in shards of about 
+		*shard_size* consecutive Rectangles, then arrange the occupied
+		rects of the shards like Rectangles, and move the Rectangles of
+		each shard into its occupied rect.
+
+		The shards are arranged by a pool of *processes* worker 
+		processes, or in this process if that is None.
+		"""
+
+		self._own_rects()
+		if self._journal is not None:
+			self._record_attrs("_checkpoint", *self._CACHES)
+			self._journal.append((JOURNAL_ARRANGE, self._rects,
+									[(r.x, r.y) for r in self._rects]))
+
+		rects = self._rects
+		shards = max(1, int(math.ceil(len(rects) / float(shard_size))))
+		bounds = [len(rects) * i // shards for i in range(shards + 1)]
+		tasks = [(array.array("d", [c for r in rects[start:end] 
+										for c in (r.w, r.h)]),
+					self.ratio, self.spots, self.strategy)
+				for start, end in zip(bounds, bounds[1:])]
+		if processes and shards > 1:
+			pool = multiprocessing.Pool(processes)
+			try:
+				results = pool.map(_arrange_shard, tasks)
+			finally:
+				pool.terminate()
+		else:
+			results = map(_arrange_shard, tasks)
+
+		top = self.__class__([Rectangle(0, 0, w, h) 
+								for coords, (w, h) in results], 
+								self.ratio, self.spots, self.strategy)
+		top.arrange()
+		positions = []
+		for box, (coords, size) in zip(top.get_rects(), results):
+			positions.extend(zip([box.x + x for x in coords[0::2]], 
+									[box.y + y for y in coords[1::2]]))
+		self._set_positions(positions)
+		self.__dict__.pop("_checkpoint", None)
+
+	def arrange_ratios(self, ratios):
+		"""Return a dict of clones of the cloud by each of *ratios*, 
+		with the Rectangles arranged as self.arrange would for that 
+		ratio.
+
+		The layouts are arranged together. Ratios share one clone while
+		their Rectangles take the same positions, and the clone branches
+		where they don't. The positions of a Rectangle for all ratios of
+		a clone come from one search, see 
+		PlacementStrategy.get_positions_by_ratio.
+		"""
+
+		empty = self.__class__((), self.ratio, self.spots, self.strategy)
+		branches = [(empty, sorted(set(ratios)))]
+		for r in self._rects:
+			grown = []
+			for cloud, group in branches:
+				if not cloud.get_rects() or not r:
+					positions = [(0, 0)] * len(group)
+				else:
+					positions = cloud.strategy.get_positions_by_ratio(
+									cloud, r, group)
+				by_position = collections.OrderedDict()
+				for ratio, position in zip(group, positions):
+					by_position.setdefault(position, []).append(ratio)
+				last = len(by_position) - 1
+				for i, (position, branch) in enumerate(by_position.items()):
+					## Clone before the cloud itself changes.
+					child = cloud if i == last else cloud.clone()
+					child.add_rect(r.clone(), position)
+					grown.append((child, branch))
+			branches = grown
+
+		layouts = {}
+		for cloud, group in branches:
+			for ratio in group:
+				layouts[ratio] = layout = cloud.clone()
+				layout.ratio = ratio
+		return layouts
+
+	def _set_positions(self, positions):
+		"""Move the Rectangles to *positions*, a sequence of (x, y)."""
+
+		for r, (x, y) in zip(self._rects, positions):
+			r.x, r.y = x, y
+		self._invalidate()
+		self.__dict__.pop("_free_space", None)
+		self.__dict__.pop("_placement_state", None)
+		self._emit_placed()
+
+	def _arrange_beam(self, rects, beam, timeout):
+		"""Arrange *rects* by a beam search, see self.arrange. Return 
+		False if *timeout* cut it short.
+		"""
+
+		deadline = timeout is not None and time.time() + timeout
+		complete = True
+		layouts = [self.clone()]
+		area = 0
+		for i, r in enumerate(rects):
+			if deadline and time.time() > deadline:
+				complete = False
+				best = layouts[0]
+				if i:
+					best = max(layouts, key=lambda layout: _rate_layout(
+								layout.get_occupied_rect(), area, self.ratio))
+				for rest in rects[i:]:
+					best.add_rect(rest.clone())
+				layouts = [best]
+				break
+
+			expanded = [_expand_layout(layout, r, beam) for layout in layouts]
+
+			## The first layout always continues greedily, so the 
+			## result can't be worse than without a beam.
+			greedy = expanded[0][:1]
+			expanded[0] = expanded[0][1:]
+			best = [(rating, 0, x, y) for rating, x, y in greedy]
+			best += sorted(((rating, j, x, y)
+							for j, expansions in enumerate(expanded)
+							for rating, x, y in expansions),
+							key=lambda t: t[0], reverse=True)[:beam - 1]
+			children = []
+			for j, x, y in [t[1:] for t in best]:
+				child = layouts[j].clone()
+				child.add_rect(r.clone(), (x, y))
+				children.append(child)
+			layouts = children
+			area += r.get_area()
+
+		area = sum(r.get_area() for r in rects)
+		best = max(layouts, key=lambda layout: _rate_layout(
+					layout.get_occupied_rect(), area, self.ratio))
+		for r, placed in zip(rects, best.get_rects()):
+			r.x, r.y = placed.x, placed.y
+		self._rects = rects
+		self._shared_list, self._shared_rects = False, 0
+		self._invalidate()
+		for name in ("_occupied_rect", "_free_space", "_placement_state"):
+			if name in best.__dict__:
+				self.__dict__[name] = best.__dict__[name]
+		if "_free_space" in self.__dict__:
+			self._free_space = self._free_space.copy()
+		return complete
+
+	def make_candidates_data(self, spot, rect):
+		occ = self.get_occupied_rect()
+		intsec = spot.get_intersection(occ)
+		if intsec:
+			leeway = intsec
+		else:
+			## There is no intersection, so the spot points to infinity
+			## on all sides but one.
+			leeway = spot
+
+		cand = rubberband(occ.get_center(), leeway, rect)
+		## *leeway* may be smaller than *rect*, keep *cand* inside *spot*.
+		cand = rubberband(cand.get_center(), spot, cand)
+		return [(cand, intsec, spot)]
+
+	def make_candidates_data_many(self, spots, rect):
+		"""Return the candidates data of self.make_candidates_data for 
+		all *spots* at once, using the array functions.
+		"""
+
+		_get_numpy()
+		if not spots:
+			return []
+		occ = self.get_occupied_rect()
+		## Spots reach to INF, and a float can't hold the x of such a 
+		## spot with the w that brings its far edge back near the cloud.
+		## The edges are clipped to well around the cloud, before they 
+		## become floats, which doesn't change the candidates.
+		margin = _get_reach(occ, rect)
+		left, right = occ.x - margin, occ.x + occ.w + margin
+		lower, upper = occ.y - margin, occ.y + occ.h + margin
+		rows = []
+		for sp in spots:
+			x, y = max(sp.x, left), max(sp.y, lower)
+			rows.append((x, y, min(sp.x + sp.w, right) - x, 
+							min(sp.y + sp.h, upper) - y))
+		spot_columns = numpy.array(rows, dtype=float).T
+		intsec = _get_intersection_many(spot_columns, occ)
+		found = intsec[2] * intsec[3] != 0
+		leeway = [numpy.where(found, i, s) 
+					for i, s in zip(intsec, spot_columns)]
+
+		cand = rubberband_many(occ.get_center(), leeway, rect)
+		cx, cy = cand[0] + rect.w / 2.0, cand[1] + rect.h / 2.0
+		x, y = rubberband_many((cx, cy), spot_columns, cand)[:2]
+		intsec = numpy.array(intsec).T.tolist()
+		return [(Rectangle(cand_x, cand_y, rect.w, rect.h), 
+					Rectangle(*i) if f else Rectangle(), sp)
+				for cand_x, cand_y, i, f, sp in zip(x.tolist(), y.tolist(), 
+												intsec, found.tolist(), spots)]
+
+	def rate_candidates(self, candidates_data, ratio=None):
+		"""Return the candidates of *candidates_data* with their 
+		ratings, as (rating, candidate), for the *ratio* of width to 
+		height of the cloud, self.ratio by default.
+		"""
+
+		target_ratio = self.ratio if ratio is None else ratio
+		occ = self.get_occupied_rect()
+		ratios = []
+		candidates = []
+		for cand, intsec, spot in candidates_data:
+			cand.debuginfo = dict(intsec=intsec, spot=spot)
+
+			intsec_cand_intsec = cand.get_intersection(intsec)
+
+			cand.debuginfo["intsec_cand_intsec"] = intsec_cand_intsec
+
+			## Ratio of how much of *cand* is inside *occ*.
+			inside = intsec_cand_intsec.get_area() / float(cand.get_area())
+
+			cand.debuginfo["inside"] = inside
+
+			ratio = 0.0
+			if inside:
+				## How well is the usage of space of *cand* in *intsec*?
+				usage = intsec_cand_intsec.get_area() / float(intsec.get_area())
+
+				cand.debuginfo["usage"] = usage
+				ratio = inside * usage
+
+			if (1.0 - inside):
+				## By how much unused space will the global occupied area grow?
+				excess = cand.get_union(occ).get_area() - cand.get_area() \
+							- occ.get_area() \
+							+ cand.get_intersection(occ).get_area()
+
+				cand.debuginfo["excess"] = excess
+
+				## The ratio of unused additional space to the now occupied 
+				## space.
+				excess_ratio = excess / float(occ.get_area())
+				cand.debuginfo["excess_ratio"] = excess_ratio
+
+				## How much (in percent) does the new aspect ratio
+				## deviate from the desired ratio?
+				ratio_dist = (abs(
+					occ.get_aspect_ratio()
+					/ get_new_ratio(occ, cand)
+					- target_ratio + 1
+				))
+				cand.debuginfo.update(ratio_dist=ratio_dist)
+				cand.debuginfo.update(get_new_ratio=get_new_ratio(occ,cand))
+				cand.debuginfo.update(self_ratio=target_ratio)
+
+				## A candidate that grows the occupied area without leaving
+				## unused space gets the highest rating.
+				ratio += ((1 - inside) / max(excess_ratio, EPSILON)) \
+							/ (10 ** ratio_dist)
+
+			cand.debuginfo["ratio"] = ratio
+			ratios.append(ratio)
+			candidates.append(cand)
+
+		return zip(ratios, candidates)
+
+	def choose_best_candidate(self, rated_candidates):
+		## Break ties between equally rated candidates by their 
+		## position, not by the order of the candidates set.
+		return max(rated_candidates, 
+					key=lambda (ratio, c): (ratio, c.y, c.x))[1]
+
+	def get_spots_for_rectangle(self, rectangle):
+		"""Return regions of empty space amongst the 
+		rectangles in the cloud where *rectangle* fits in.
+
+		With *self.spots* set to SPOTS_MAXIMAL, the spots are the
+		maximal empty rectangles that are large enough for *rectangle*.
+		"""
+
+		if self.spots == SPOTS_MAXIMAL:
+			return self.get_free_space().get_fitting(rectangle.w, rectangle.h)
+
+		size_class = rectangle.w, rectangle.h
+		if self.reuse_spots:
+			spot_cache = self.__dict__.get("_spot_cache")
+			if spot_cache is not None and spot_cache[0] == size_class:
+				self.spots_reused += 1
+				return list(spot_cache[1])
+
+		spots = []
+		for direction in (DIRECTION_RIGHT, DIRECTION_LEFT, DIRECTION_UP,
+														DIRECTION_DOWN):
+			seeds = self._get_cached_seeds(direction)
+			if self.prune_seeds:
+				size = rectangle.h if direction in (DIRECTION_RIGHT, 
+											DIRECTION_LEFT) else rectangle.w
+				gaps = self._get_seed_gaps(direction)
+				fitting = [seed for seed, gap in zip(seeds, gaps) 
+							if gap >= size]
+				self.seeds_pruned += len(seeds) - len(fitting)
+				seeds = fitting
+			self.seeds_searched += len(seeds)
+			for seed in seeds:
+				sp = self._get_spot(rectangle, seed, direction)
+				if sp and sp not in spots:
+					spots.append(sp)
+		if self.reuse_spots:
+			self._record_attrs("_spot_cache")
+			self._spot_cache = (size_class, spots[:])
+		return spots
+
+	def _trim_spots(self, spots, rect, dx, dy, occ):
+		"""Return the spots *spots*, found before Rectangle *rect* was 
+		added and the cloud moved by *dx*, *dy*, without the space of 
+		*rect*. A spot that *rect* cuts into is split into the parts on
+		each of its sides, like the free rectangles of 
+		MaximalRectangles, and the parts that *rect* doesn't fit in any
+		more are dropped. Float edges are clipped to the reach around 
+		the new occupied rect *occ*, see self._get_spot.
+
+		The spots miss what the seed points that *rect* adds would 
+		find, which the strategy's candidates are close to anyway.
+		"""
+
+		rx0, ry0 = rect.x, rect.y
+		rx1, ry1 = rx0 + rect.w, ry0 + rect.h
+		reach = _get_reach(occ, rect)
+		left, right = occ.x - reach, occ.x + occ.w + reach
+		lower, upper = occ.y - reach, occ.y + occ.h + reach
+		trimmed = []
+		for sp in spots:
+			## The far edges are found before the move, so an edge near 
+			## the cloud isn't lost to one at INF.
+			x0, y0 = sp.x + dx, sp.y + dy
+			x1, y1 = sp.x + sp.w + dx, sp.y + sp.h + dy
+			if isinstance(x0 + y0 + x1 + y1, float):
+				x0, y0 = max(x0, left), max(y0, lower)
+				x1, y1 = min(x1, right), min(y1, upper)
+			if not (x0 < rx1 and rx0 < x1 and y0 < ry1 and ry0 < y1):
+				pieces = [(x0, y0, x1, y1)]
+			else:
+				pieces = []
+				if x0 < rx0:
+					pieces.append((x0, y0, rx0, y1))
+				if rx1 < x1:
+					pieces.append((rx1, y0, x1, y1))
+				if y0 < ry0:
+					pieces.append((x0, y0, x1, ry0))
+				if ry1 < y1:
+					pieces.append((x0, ry1, x1, y1))
+			for px0, py0, px1, py1 in pieces:
+				piece = Rectangle(px0, py0, px1 - px0, py1 - py0)
+				if piece.w >= rect.w and piece.h >= rect.h \
+						and piece not in trimmed:
+					trimmed.append(piece)
+		return trimmed
+
+	def get_seed_stats(self):
+		"""Return a dict of the numbers of seed points that 
+		self.get_spots_for_rectangle pruned and searched.
+		"""
+
+		return dict(pruned=self.seeds_pruned, searched=self.seeds_searched)
+
+	def _get_cached_seeds(self, direction):
+		"""Return self._get_seed_points(*direction*), which is kept 
+		until the cloud changes.
+		"""
+
+		name = "_seeds_cache_%s" % direction
+		seeds = self.__dict__.get(name)
+		if seeds is None:
+			seeds = self.__dict__[name] = self._get_seed_points(direction)
+		return seeds
+
+	def _get_seed_gaps(self, direction):
+		"""Return the gaps of the seed points of *direction*: the length
+		of the free stretch around a seed point, across *direction*, on
+		the line along the side of the Rectangles that the seed point 
+		lies on. A Rectangle larger than the gap across *direction* 
+		doesn't fit in a spot of that seed point, which 
+		self._get_spot would only find after searching.
+		"""
+
+		name = "_gaps_cache_%s" % direction
+		gaps = self.__dict__.get(name)
+		if gaps is not None:
+			return gaps
+
+		seeds = self._get_cached_seeds(direction)
+		horizontal = direction in (DIRECTION_RIGHT, DIRECTION_LEFT)
+		sign = 1 if direction in (DIRECTION_RIGHT, DIRECTION_UP) else -1
+		## The extents (a, b) of the Rectangles along *direction*, 
+		## flipped so that a Rectangle blocks the line at c if 
+		## a <= c < b, and (lo, hi) across it.
+		extents = []
+		for r in self._rects:
+			if horizontal:
+				a, b, lo, hi = r.x, r.x + r.w, r.y, r.y + r.h
+			else:
+				a, b, lo, hi = r.y, r.y + r.h, r.x, r.x + r.w
+			extents.append(sign > 0 and (a, b, lo, hi) or (-b, -a, lo, hi))
+		extents.sort()
+
+		## Sweep the lines of the seed points in order, keeping the 
+		## Rectangles that block the current one in a heap by their end,
+		## and their (lo, hi) sorted in *across*. They don't overlap, so
+		## the one before *pivot* in *across* is the nearest below it.
+		gaps = [None] * len(seeds)
+		blocking = []
+		across = []
+		j = 0
+		for i in sorted(range(len(seeds)), 
+						key=lambda i: sign * seeds[i][not horizontal]):
+			line, pivot = seeds[i] if horizontal else seeds[i][::-1]
+			line *= sign
+			while j < len(extents) and extents[j][0] <= line:
+				heapq.heappush(blocking, (extents[j][1], j))
+				bisect.insort(across, extents[j][2:] + (j,))
+				j += 1
+			while blocking and blocking[0][0] <= line:
+				k = heapq.heappop(blocking)[1]
+				del across[bisect.bisect_left(across, extents[k][2:] + (k,))]
+
+			n = bisect.bisect_right(across, (pivot, INF))
+			low = across[n-1][1] if n else -INF
+			high = across[n][0] if n < len(across) else INF
+			gaps[i] = high - low if low <= pivot else 0
+
+		self.__dict__[name] = gaps
+		return gaps
+
+	def _get_seed_points(self, direction):
+		"""Return points on the rectangles in the cloud,
+		where a search (as done in self._get_spot) can
+		start from.
+		"""
+
+		sortkey = SORTKEYS[direction]
+		halver = HALVERS[direction]
+		stampgetter = STAMPGETTERS[direction]
+
+		if direction in (DIRECTION_RIGHT, DIRECTION_LEFT):
+			seedgetter = lambda r: (sortkey(r), halver(r))
+			swapper = lambda current, half: (sortkey(current), half)
+		else:
+			seedgetter = lambda r: (halver(r), sortkey(r))
+			swapper = lambda current, half: (half, sortkey(current))
+		
+		seeds = []
+
+		s = self._get_sorted_DIRECTION(direction, sortkey)
+		if direction in (DIRECTION_RIGHT, DIRECTION_UP):
+			s = s[::-1]
+		
+		cur = s[0]
+		seeds.append(seedgetter(cur))
+		stamps = [stampgetter(cur)]
+		
+		i = 1
+		while i < len(s):
+			cur = s[i]
+
+			curlo, curhi = stampgetter(cur)
+			
+			j = 0
+			while j < len(stamps):
+				stamplo, stamphi = stamps[j]
+				
+				if curlo < stamplo <= curhi:
+					seeds.append(swapper(cur,
+									curlo + (stamplo - curlo) / 2.0))
+					stamps[j] = (curlo, stamphi)
+
+					if curhi <= stamphi:
+						break
+
+				if curlo <= stamphi < curhi:
+					## It's the last stamp or not the last stamp and
+					## the following stamps lower point is above
+					## the rects upper border.
+					if j == len(stamps) - 1 \
+						or j < len(stamps) - 1 and curhi <= stamps[j+1][0]:
+						seeds.append(swapper(cur, 
+										stamphi + (curhi - stamphi) / 2.0))
+						stamps[j] = (stamplo, curhi)
+						
+						break
+						
+				if curhi < stamplo:
+					seeds.append(swapper(cur,
+									curlo + (curhi - curlo) / 2.0))
+					stamps.append(stampgetter(cur))
+					
+					break
+
+				curlo = stamphi
+				j += 1
+
+			stamps.sort()
+			i += 1
+		return seeds
+
+	def	_get_spot(self, rectangle, seed, direction):
+		"""Return a region of empty space between the
+		rectangles of the cloud where *rectangle* fits in,
+		or *None* if the search fails.
+
+		A spot's borders are defined by rectangles 
+		encountered in a search. The search begins at
+		the point *seed* and first tries to accomodate
+		*rectangle* on the axis perpendicular to
+		*direction*, so it is not blocked by other
+		rectangles along that axis. E.g.: 
+			
+			*direction* == DIRECTION_RIGHT =>
+				Accomodate along vertical axis.
+			*direction* == DIRECTION_DOWN =>
+				Accomodate along horizontal axis.
+
+		From the accomodation point, the search continues
+		along *direction* until it hits a rectangle. The 
+		border of that rectangle that is nearest to *seed*
+		determines the 'upper' limit of the spot (the 
+		'lower' one being determined by *seed*). If there 
+		are no rectangles encountered, the spot points
+		to *INFINITY* in that direction.
+
+		From there, the selection is extended on its sides. 
+		The nearest Rectangles found determine the sides of 
+		the spot.
+
+		Parameters:
+			*rectangle*: type Rectangle.
+			*seed*: type tuple, length 2.
+			*direction*: type int, one of (
+							DIRECTION_RIGHT, 
+							DIRECTION_LEFT, 
+							DIRECTION_UP,
+							DIRECTION_DOWN
+						)
+		"""
+		
+		sx, sy = seed
+
+		facing_right = direction == DIRECTION_RIGHT
+		facing_up = direction == DIRECTION_UP
+		facing_left = direction == DIRECTION_LEFT
+		facing_down = direction == DIRECTION_DOWN
+		horizontal = facing_left or facing_right
+
+		occ = self.get_occupied_rect()
+
+		sel = partition(occ, seed, direction)
+		sidesel = sel.clone()
+		ortsel = Rectangle(
+			0,
+			0, 
+			sel.w if horizontal else rectangle.w,
+			sel.h if not horizontal else rectangle.h
+		)
+
+		if horizontal:
+			sortkey_sides = lambda r: r.y
+			endkey_sides = lambda r: r.y + r.h
+			pivot = sy
+		else:
+			sortkey_sides = lambda r: r.x
+			endkey_sides = lambda r: r.x + r.w
+			pivot = sx
+
+		selection = self.get_selection_by_rect(sel)
+
+		## With float edges the spot reaches as far as any candidate 
+		## needs, not to INF, see _get_reach. Rectangles that only 
+		## overlap a selection by rounding touch it, as in 
+		## self.find_overlaps, so the selections shrink by that much, 
+		## and one thinner than that selects nothing.
+		far, select = INF, select_by_rect
+		if isinstance(sum((r.x + r.y + r.w + r.h for r in selection), 
+					sel.x + sel.y + sel.w + sel.h + rectangle.w + rectangle.h), 
+					float):
+			far = _get_reach(occ, rectangle)
+			slack = ROUNDING * max(abs(occ.x), abs(occ.y), 
+									abs(occ.x + occ.w), abs(occ.y + occ.h))
+			select = lambda rects, s: [] if min(s.w, s.h) <= 2 * slack \
+				else select_by_rect(rects, Rectangle(s.x + slack, s.y + slack, 
+										s.w - 2 * slack, s.h - 2 * slack))
+			selection = select(selection, sel)
+
+		########################################################
+		##  Make sure *rectangle* fits on the sideways axis.  ##
+		## Move *ortsel* so its middle is closest to *pivot*. ##
+		########################################################
+
+		restrictor = Rectangle(
+			sel.x + (sel.w - rectangle.w) * facing_left,
+			sel.y + (sel.h - rectangle.h) * facing_down,
+			rectangle.w if horizontal else sel.w,
+			rectangle.h if not horizontal else sel.h
+		)
+		
+		leeway = sel.clone()
+
+		sideways = select(selection, restrictor)
+		if sideways:
+			sideways.sort(key=sortkey_sides)
+			extract = [sortkey_sides(r) for r in sideways]
+			i = bisect.bisect(extract, pivot)
+
+			## Fringe case 1: sy is below lowest rect's y.
+			if not i:
+				ir = sideways[0]
+				if horizontal:
+					leeway.y = min((leeway.y, ir.y - rectangle.h))
+					leeway.h = ir.y - leeway.y
+				else:
+					leeway.x = min((leeway.x, ir.x - rectangle.w))
+					leeway.w = ir.x - leeway.x
+
+			## Fringe case 2: sy is above highest rect's y. The rect 
+			## below reaching highest bounds the leeway, which needn't 
+			## be the one starting highest.
+			elif i == len(sideways):
+				ir = max(sideways, key=endkey_sides)
+
+				if _does_cut(ir, pivot, horizontal):
+					return None
+
+				if horizontal:
+					leeway.y = ir.y + ir.h
+					leeway.h = max((leeway.y + rectangle.h, sel.y + sel.h)) \
+								- leeway.y
+				else:
+					leeway.x = ir.x + ir.w
+					leeway.w = max((leeway.x + rectangle.w, sel.x + sel.w)) \
+								- leeway.x
+
+			## Norm case: sy is inside the rects' y values.
+			else:
+				ir0 = max(sideways[:i], key=endkey_sides)
+				if _does_cut(ir0, pivot, horizontal):
+					return None
+
+				ir1 = sideways[i]
+				## space between ir0 and ir1 is too small for rectangle.
+				if horizontal and (ir1.y - (ir0.y + ir0.h) < rectangle.h) \
+					or not horizontal and (ir1.x - (ir0.x + ir0.w) < rectangle.w):
+					return None
+
+				if horizontal:
+					leeway.y = ir0.y + ir0.h
+					leeway.h = ir1.y - leeway.y
+				else:
+					leeway.x = ir0.x + ir0.w
+					leeway.w = ir1.x - leeway.x
+
+		ortsel = rubberband(seed, leeway, ortsel)
+
+		############################################
+		## Determine orthogonal top of *sidesel*. ##
+		############################################
+
+		orthogonals = select(selection, ortsel)
+		if orthogonals:
+			if facing_left:
+				sortkey_orth = lambda r: r.x + r.w
+			elif facing_right:
+				sortkey_orth = lambda r: r.x
+			elif facing_up:
+				sortkey_orth = lambda r: r.y
+			elif facing_down:
+				sortkey_orth = lambda r: r.y + r.h
+
+			orthogonals.sort(key=sortkey_orth, 
+								reverse=(facing_right or facing_up))
+
+			sr = orthogonals[-1]
+			if facing_left:
+				sidesel.x = sr.x + sr.w
+				sidesel.w = sel.x + sel.w - sidesel.x
+			elif facing_right:
+				sidesel.w = sr.x - sel.x
+			elif facing_down:
+				sidesel.y = sr.y + sr.h
+				sidesel.h = sel.y + sel.h - sidesel.y
+			elif facing_up:
+				sidesel.h = sr.y - sel.y
+		else:
+			if facing_left:
+				sidesel.x = sel.x - far
+				sidesel.w = sel.x + sel.w - sidesel.x
+			elif facing_right:
+				sidesel.w = far + sel.w
+			elif facing_up:
+				sidesel.h = far + sel.h
+			elif facing_down:
+				sidesel.y = sel.y - far
+				sidesel.h = sel.y + sel.h - sidesel.y
+
+		####################################
+		## Select values for side bounds. ##
+		####################################
+
+		sideways = select(selection, sidesel)
+		if sideways:
+			sideways.sort(key=sortkey_sides)
+			extract = [sortkey_sides(r) for r in sideways]
+			i = bisect.bisect(extract, pivot)
+
+			## Fringe case 1: *pivot* is below lowest rect's pivot value.
+			if not i:
+				if horizontal:
+					sidesel.y = sel.y - far
+					sidesel.h = sideways[0].y - sidesel.y
+				else:
+					sidesel.x = sel.x - far
+					sidesel.w = sideways[0].x - sidesel.x
+
+			## Fringe case 2: *pivot* is above highest rect's pivot value.
+			elif i == len(sideways):
+				ir = max(sideways, key=endkey_sides)
+
+				if _does_cut(ir, pivot, horizontal):
+					return None
+
+				if horizontal:
+					sidesel.y = ir.y + ir.h
+					sidesel.h = sel.y + sel.h - sidesel.y + far
+				else:
+					sidesel.x = ir.x + ir.w
+					sidesel.w = sel.x + sel.w - sidesel.x + far
+
+			## Norm case: *pivot* is inside the rects' 
+			## corresponding axis' values.
+			else:
+				ir0 = max(sideways[:i], key=endkey_sides)
+
+				if _does_cut(ir0, pivot, horizontal):
+					return None
+
+				ir1 = sideways[i]
+				## space between ir0 and ir1 is too small for rectangle.
+				if horizontal and (ir1.y - (ir0.y + ir0.h) < rectangle.h) \
+					or not horizontal and (ir1.x - (ir0.x + ir0.w) < rectangle.w):
+					return None
+
+				if horizontal:
+					sidesel.y = ir0.y + ir0.h
+					sidesel.h = ir1.y - sidesel.y
+				else:
+					sidesel.x = ir0.x + ir0.w
+					sidesel.w = ir1.x - sidesel.x
+		else:
+			if horizontal:
+				sidesel.y = sel.y - far
+				sidesel.h = sel.h + 2 * far
+			else:
+				sidesel.x = sel.x - far
+				sidesel.w = sel.w + 2 * far
+
+		return sidesel
+
+
+class CloudRectangle(Rectangle):
+	"""RectangleCloud *cloud* as a Rectangle at *x*, *y* of another 
+	cloud, so clouds can be nested. Its w and h are those of the 
+	occupied rect of *cloud*, kept until *cloud* changes.
+
+	A CloudRectangle is dirty while the layout of its cloud is out of 
+	date, because a CloudRectangle in it changed its size, or because it
+	was never arranged. A change in a cloud changes the size of its 
+	CloudRectangle, so it makes the CloudRectangles above that one 
+	dirty, not that one itself. self.arrange only arranges the dirty 
+	ones, and only moves the CloudRectangles that changed their size.
+	"""
+
+	def __init__(self, cloud, x=0, y=0):
+		self.x, self.y = x, y
+		self.cloud = cloud
+		self.parent = None
+		self.dirty = True
+		self._size = None
+		self._resized = []
+		cloud._owner = self
+		for r in cloud.get_rects():
+			if isinstance(r, CloudRectangle) and r.parent is None:
+				r.parent = self
+
+	def _get_size(self):
+		if self._size is None:
+			occ = self.cloud.get_rects() and self.cloud.get_occupied_rect()
+			self._size = occ and (occ.w, occ.h) or (0, 0)
+		return self._size
+
+	w = width = property(lambda self: self._get_size()[0])
+	h = height = property(lambda self: self._get_size()[1])
+
+	def _changed(self):
+		"""Forget the size, and make the CloudRectangles above dirty, 
+		each remembering the one below it that changed its size.
+		"""
+
+		self._size = None
+		child, parent = self, self.parent
+		while parent is not None:
+			if not any(r is child for r in parent._resized):
+				parent._resized.append(child)
+			if parent.dirty:
+				break
+			parent.dirty = True
+			parent._size = None
+			child, parent = parent, parent.parent
+
+	def clone(self):
+		return self.__class__(self.cloud.clone(), self.x, self.y)
+
+	def __reduce__(self):
+		return self.__class__, (self.cloud, self.x, self.y), \
+				dict(dirty=self.dirty)
+
+	def get_intersection(self, other):
+		return Rectangle(*self).get_intersection(other)
+
+	def get_union(self, other):
+		return Rectangle(*self).get_union(other)
+
+	def arrange(self, *args, **kwargs):
+		"""If this one is dirty, arrange the clouds of the dirty 
+		CloudRectangles in its cloud, then refit those that changed 
+		their size (see RectangleCloud.refit_rect). The others stay 
+		where they are. A cloud that was never arranged is arranged as a
+		whole. The arguments are those of RectangleCloud.arrange.
+		"""
+
+		if not self.dirty:
+			return
+		resized = self._resized[:]
+		for r in resized or self.cloud.get_rects():
+			if isinstance(r, CloudRectangle):
+				r.arrange(*args, **kwargs)
+		if resized:
+			## Those removed from the cloud since have nothing to fit.
+			present = set(map(id, self.cloud.get_rects()))
+			for r in resized:
+				if id(r) in present:
+					self.cloud.refit_rect(r)
+		else:
+			self.cloud.arrange(*args, **kwargs)
+		self._resized = []
+		self.dirty = False
+
+	def iter_leaves(self):
+		"""Yield the Rectangles in the clouds below that aren't 
+		CloudRectangles, with their x and y in the cloud of this one, 
+		as (rect, x, y).
+		"""
+
+		rects = self.cloud.get_rects()
+		if not rects:
+			return
+		occ = self.cloud.get_occupied_rect()
+		dx, dy = self.x - occ.x, self.y - occ.y
+		for r in rects:
+			if isinstance(r, CloudRectangle):
+				for leaf, x, y in r.iter_leaves():
+					yield leaf, x + dx, y + dy
+			else:
+				yield r, r.x + dx, r.y + dy
+
+
+class ConcurrentCloud(object):
+	"""A RectangleCloud, or the one of *cloud*, that threads can query 
+	while one of them changes it.
+
+	Changes are made to a private clone of the last published cloud 
+	(see RectangleCloud.clone), one thread at a time, and then the clone
+	is published. Queries are answered by the last published cloud, so 
+	they never wait for a change and never see a part of one. The 
+	private clone copies the Rectangles, once, when a change is about to
+	move them. *cloud* is the first one published, and mustn't be 
+	changed directly afterwards.
+
+	A change is published at its end only if the last published cloud 
+	was queried, else by the next query, so the changes that no query 
+	sees in between are published, and copied, together. A query made 
+	while a change is being made doesn't wait for it, and may miss the 
+	changes made since the last query. self.epoch counts the 
+	publications.
+	"""
+
+	## The methods of RectangleCloud that answer queries, and may be
+	## called from several threads on the same clone.
+	QUERIES = frozenset(["get_rectangles", "get_rects", "get_occupied_rect",
+		"get_selection_by_rect", "get_sorted_left", "get_sorted_lower", 
+		"get_sorted_right", "get_sorted_upper", "get_index", "hit_test", 
+		"hit_test_many", "nearest", "nearest_in_direction", 
+		"iter_viewport", "get_viewport_delta", "find_overlaps", 
+		"is_valid", "write_positions", "save"])
+
+	def __init__(self, cloud=None):
+		self._cloud = RectangleCloud() if cloud is None else cloud
+		self._lock = threading.RLock()
+		self._depth = 0			# of the changes being made
+		self.epoch = 0
+		self._publish()
+
+	def _publish(self):
+		self._snapshot = self._cloud
+		self._cloud = self._cloud.clone()
+		self._pending = self._queried = False
+		self.epoch += 1
+
+	def get_snapshot(self):
+		"""Return the last published cloud. It doesn't change. The 
+		changes made since are published first, unless a change is 
+		being made.
+		"""
+
+		if self._pending and self._lock.acquire(False):
+			try:
+				if self._pending and not self._depth:
+					self._publish()
+			finally:
+				self._lock.release()
+		self._queried = True
+		return self._snapshot
+
+	@contextlib.contextmanager
+	def changing(self):
+		"""Lock out other changes, and return the private cloud to 
+		change, in a with statement. The changes are published together
+		at its end, or rolled back if it raises.
+		"""
+
+		with self._lock:
+			cloud = self._cloud
+			savepoint = cloud.savepoint()
+			self._depth += 1
+			try:
+				yield cloud
+			except:
+				cloud.rollback(savepoint)
+				raise
+			finally:
+				self._depth -= 1
+			cloud.release(savepoint)
+			if not self._depth:
+				self._pending = True
+				if self._queried:
+					self._publish()
+
+	def add_rect(self, rect, position=None):
+		with self.changing() as cloud:
+			cloud.add_rect(rect, position)
+
+	def move_all(self, x=0, y=0):
+		with self.changing() as cloud:
+			cloud.move_all(x, y)
+
+	def arrange(self, *args, **kwargs):
+		with self.changing() as cloud:
+			cloud.arrange(*args, **kwargs)
+
+	def __contains__(self, obj):
+		return obj in self.get_snapshot()
+
+	def __getattr__(self, name):
+		if name in self.QUERIES:
+			return getattr(self.get_snapshot(), name)
+		raise AttributeError("%r is not a query of a %s" 
+								% (name, self.__class__.__name__))
+
+
+class SharedCloud(object):
+	"""The RectangleCloud published to the file *path* by 
+	RectangleCloud.publish, for its queries only (see 
+	ConcurrentCloud.QUERIES).
+
+	The file is memory-mapped, with the sorted lists and the 
+	RectangleIndex of the cloud, so the processes that attach it share 
+	the pages of the file, and only make the Rectangles that their 
+	queries return. A SharedCloud is pickled as its path, to be passed 
+	to worker processes.
+	"""
+
+	def __init__(self, path):
+		self.path = path
+		self.refresh()
+
+	def refresh(self):
+		"""Attach the file again if it was published again since. 
+		Return whether it was.
+		"""
+
+		stat = os.stat(self.path)
+		version = stat.st_ino, stat.st_mtime, stat.st_size
+		if version == getattr(self, "_version", None):
+			return False
+		self._cloud = RectangleCloud.load(self.path)
+		self._version = version
+		return True
+
+	def __reduce__(self):
+		return self.__class__, (self.path,)
+
+	def __len__(self):
+		return len(self._cloud.get_rects())
+
+	def __contains__(self, obj):
+		return obj in self._cloud
+
+	def __getattr__(self, name):
+		if name in ConcurrentCloud.QUERIES:
+			return getattr(self._cloud, name)
+		raise AttributeError("%r is not a query of a %s" 
+								% (name, self.__class__.__name__))
+
+
+class LayoutCache(object):
+	"""Layouts computed by RectangleCloud.arrange, by the sizes of the 
+	Rectangles, their order and the cloud's settings.
+
+	The *maxsize* most recently used layouts are kept in memory. With a
+	*path*, all layouts are also stored in an sqlite database there, 
+	which outlives the process, until self.close. A cache may be used 
+	by several threads.
+	"""
+
+	def __init__(self, maxsize=1024, path=None):
+		self.maxsize = maxsize
+		self.path = path
+		self._layouts = collections.OrderedDict()
+		self._db = None
+		self._lock = threading.Lock()
+		self.hits = self.disk_hits = self.misses = 0
+
+	def get_key(self, cloud, beam=1):
+		"""Return the key of the layout of RectangleCloud *cloud* as 
+		arranged with *beam* width.
+		"""
+
+		signature = repr((
+			[(float(r.w), float(r.h)) for r in cloud.get_rects()],
+			float(cloud.ratio),
+			cloud.spots,
+			cloud.reuse_spots,
+			cloud.strategy.key(),
+			beam,
+		))
+		return hashlib.sha1(signature).hexdigest()
+
+	def _get_db(self):
+		if self._db is None:
+			self._db = sqlite3.connect(self.path, check_same_thread=False)
+			self._db.execute("CREATE TABLE IF NOT EXISTS layouts "
+								"(key TEXT PRIMARY KEY, positions BLOB)")
+		return self._db
+
+	def get(self, key):
+		"""Return the positions (x, y) of the layout stored under *key*,
+		or None.
+		"""
+
+		with self._lock:
+			positions = self._layouts.pop(key, None)
+			if positions is not None:
+				self.hits += 1
+				self._layouts[key] = positions
+				return positions
+
+			if self.path is not None:
+				row = self._get_db().execute(
+					"SELECT positions FROM layouts WHERE key = ?", (key,)
+				).fetchone()
+				if row is not None:
+					coords = array.array("d")
+					coords.fromstring(str(row[0]))
+					positions = zip(coords[::2], coords[1::2])
+					self.hits += 1
+					self.disk_hits += 1
+					self._remember(key, positions)
+					return positions
+
+			self.misses += 1
+			return None
+
+	def put(self, key, positions):
+		"""Store the positions (x, y) of a layout under *key*."""
+
+		positions = list(positions)
+		with self._lock:
+			self._remember(key, positions)
+			if self.path is not None:
+				coords = array.array("d", [c for p in positions for c in p])
+				db = self._get_db()
+				db.execute("INSERT OR REPLACE INTO layouts VALUES (?, ?)",
+							(key, buffer(coords.tostring())))
+				db.commit()
+
+	def close(self):
+		"""Close the database. It is opened again when it is needed."""
+
+		with self._lock:
+			if self._db is not None:
+				self._db.close()
+				self._db = None
+
+	def _remember(self, key, positions):
+		self._layouts.pop(key, None)
+		self._layouts[key] = positions
+		while len(self._layouts) > self.maxsize:
+			self._layouts.popitem(last=False)
+
+	def get_stats(self):
+		"""Return a dict of the numbers of hits, of hits from disk, of
+		misses and of the layouts held in memory.
+		"""
+
+		return dict(hits=self.hits, disk_hits=self.disk_hits,
+					misses=self.misses, size=len(self._layouts))
+
+
+class LayoutCheckpoint(object):
+	"""The state of a RectangleCloud after a greedy arrange: the sizes 
+	of its Rectangles, their positions, and the occupied rect, free 
+	space and placement state that adding more Rectangles starts from.
+	See RectangleCloud.arrange.
+	"""
+
+	def __init__(self, cloud):
+		rects = cloud.get_rects()
+		self.sizes = [(r.w, r.h) for r in rects]
+		self.positions = [(r.x, r.y) for r in rects]
+		self.settings = self._get_settings(cloud)
+		occ = cloud.__dict__.get("_occupied_rect")
+		self.occupied_rect = occ and occ.clone()
+		free = cloud.__dict__.get("_free_space")
+		self.free_space = free and free.copy()
+		self.placement_state = cloud.__dict__.get("_placement_state")
+
+	@staticmethod
+	def _get_settings(cloud):
+		"""Return the settings of RectangleCloud *cloud* that its layout
+		depends on, besides the sizes.
+		"""
+
+		return (cloud.ratio, cloud.spots, cloud.reuse_spots, 
+				cloud.strategy.key())
+
+	def is_prefix_of(self, cloud, rects):
+		"""Whether the Rectangles of the checkpoint have the sizes of 
+		the first ones of *rects*, which RectangleCloud *cloud* 
+		arranges with the same settings.
+		"""
+
+		if (len(self.sizes) > len(rects) or 
+				self.settings != self._get_settings(cloud)):
+			return False
+		for (w, h), r in zip(self.sizes, rects):
+			if w != r.w or h != r.h:
+				return False
+		return True
+
+	def restore(self, cloud):
+		"""Put the Rectangles of RectangleCloud *cloud* where the 
+		checkpoint's were, and take over its state.
+		"""
+
+		cloud._set_positions(self.positions)
+		if self.occupied_rect is not None:
+			cloud._occupied_rect = self.occupied_rect.clone()
+		if self.free_space is not None:
+			cloud._free_space = self.free_space.copy()
+		if self.placement_state is not None:
+			cloud._placement_state = self.placement_state
+
+
+## The strategies and spots of the command line tool, see main.
+CLI_STRATEGIES = dict(spots=SpotStrategy, skyline=SkylineStrategy,
+						maxrects=MaxRectsStrategy)
+CLI_SPOTS = dict(seeds=SPOTS_SEEDS, maximal=SPOTS_MAXIMAL)
+
+## Rows that the command line tool reads or writes at once.
+CLI_CHUNK = 4096
+
+
+def _parse_number(s):
+	try:
+		return int(s)
+	except ValueError:
+		return float(s)
+
+
+def _read_sizes(f, fmt):
+	"""Yield the sizes (w, h) in file *f*, in *fmt* "csv" or "jsonl", 
+	line by line.
+	"""
+
+	if fmt == "csv":
+		reader = csv.reader(f)
+		for row in reader:
+			if not row or row[0].startswith("#"):
+				continue
+			try:
+				yield _parse_number(row[0]), _parse_number(row[1])
+			except (ValueError, IndexError):
+				## A header.
+				if reader.line_num != 1:
+					raise ValueError("Line %i: expected w,h, got %r" 
+										% (reader.line_num, row))
+	else:
+		for i, line in enumerate(f):
+			if not line.strip():
+				continue
+			size = json.loads(line)
+			try:
+				if isinstance(size, dict):
+					yield size["w"], size["h"]
+				else:
+					w, h = size[:2]
+					yield w, h
+			except (KeyError, ValueError, TypeError):
+				raise ValueError("Line %i: expected {\"w\", \"h\"} or "
+									"[w, h], got %r" % (i + 1, size))
+
+
+def _read_cloud(f, fmt, **settings):
+	"""Return a RectangleCloud of the Rectangles of the sizes in file 
+	*f*, in *fmt* "csv", "jsonl" or "binary", i.e. pairs of 
+	little-endian doubles, read CLI_CHUNK pairs at once.
+	"""
+
+	if fmt == "binary":
+		sizes = array.array("d")
+		rest = ""
+		while True:
+			chunk = f.read(CLI_CHUNK * 2 * sizes.itemsize)
+			if not chunk:
+				break
+			chunk = rest + chunk
+			end = len(chunk) - len(chunk) % sizes.itemsize
+			sizes.fromstring(chunk[:end])
+			rest = chunk[end:]
+		if rest:
+			raise ValueError("%i bytes after the last double" % len(rest))
+		if sys.byteorder == "big":
+			sizes.byteswap()
+		return RectangleCloud.from_sizes(sizes, **settings)
+	return RectangleCloud([Rectangle(0, 0, w, h) 
+							for w, h in _read_sizes(f, fmt)], **settings)
+
+
+def _write_rects(f, rects, fmt):
+	"""Write the x, y, w and h of Rectangles *rects* to file *f*, in 
+	*fmt* "csv", "jsonl" or "binary", i.e. rows of four little-endian 
+	doubles, CLI_CHUNK rows at once.
+	"""
+
+	if fmt == "binary":
+		for start in range(0, len(rects), CLI_CHUNK):
+			_write_array(f, "d", [c for r in rects[start:start + CLI_CHUNK]
+									for c in (r.x, r.y, r.w, r.h)])
+		return
+	row = fmt == "csv" and "%r,%r,%r,%r\n" or \
+		'{"x": %r, "y": %r, "w": %r, "h": %r}\n'
+	for start in range(0, len(rects), CLI_CHUNK):
+		f.write("".join([row % (r.x, r.y, r.w, r.h) 
+							for r in rects[start:start + CLI_CHUNK]]))
+
+
+def main(argv=None):
+	"""Arrange the Rectangles of the sizes in a file or stdin, and write
+	their positions to a file or stdout. See --help.
+	"""
+
+	parser = argparse.ArgumentParser(prog="rectangles", 
+		description="Arrange rectangles of the given sizes into a cloud, "
+			"and write their x, y, w and h in the order of the sizes.")
+	parser.add_argument("input", nargs="?", default="-",
+		help="file of the sizes, - for stdin (default)")
+	parser.add_argument("-o", "--output", default="-",
+		help="file of the positions, - for stdout (default)")
+	parser.add_argument("-f", "--format", choices=("csv", "jsonl", "binary"),
+		help="format of input and output: rows w,h resp. x,y,w,h for csv, "
+			"objects or lists for jsonl, little-endian doubles for binary; "
+			"by the extension of the input, else csv")
+	parser.add_argument("-r", "--ratio", type=float, default=1.0,
+		help="ratio of width to height of the cloud (default 1.0)")
+	parser.add_argument("-s", "--strategy", choices=sorted(CLI_STRATEGIES),
+		default="maxrects", help="placement strategy (default maxrects)")
+	parser.add_argument("--spots", choices=sorted(CLI_SPOTS), 
+		default="maximal", 
+		help="spots of the spots strategy (default maximal)")
+	parser.add_argument("-b", "--beam", type=int, default=1,
+		help="beam width of the search (default 1)")
+	parser.add_argument("--stats", action="store_true",
+		help="print the timings and the density of the cloud to stderr")
+	parser.add_argument("--serve", metavar="[HOST:]PORT",
+		help="serve layouts over HTTP instead, see LayoutServer")
+	parser.add_argument("-p", "--processes", type=int,
+		help="worker processes of the server (default: one per CPU)")
+	args = parser.parse_args(argv)
+
+	if args.serve is not None:
+		host, sep, port = args.serve.rpartition(":")
+		try:
+			port = int(port)
+			if not 0 <= port < 65536:
+				raise ValueError
+		except ValueError:
+			parser.error("--serve: expected a port of 0 to 65535, got %r" 
+							% port)
+		try:
+			server = LayoutServer((host or "127.0.0.1", port), 
+									args.processes)
+		except socket.error, e:
+			sys.stderr.write("%s: error: can't serve on %s: %s\n" 
+								% (parser.prog, args.serve, e))
+			return 1
+		sys.stderr.write("Serving layouts on http://%s:%i/layout\n" 
+							% server.server_address)
+		try:
+			server.serve_forever()
+		except KeyboardInterrupt:
+			pass
+		finally:
+			server.close()
+		return 0
+
+	fmt = args.format
+	if fmt is None:
+		fmt = os.path.splitext(args.input)[1].lstrip(".")
+		fmt = dict(json="jsonl", bin="binary").get(fmt, fmt)
+		if fmt not in ("csv", "jsonl", "binary"):
+			fmt = "csv"
+
+	start = time.time()
+	infile = args.input == "-" and sys.stdin or open(args.input, "rb")
+	try:
+		cloud = _read_cloud(infile, fmt, ratio=args.ratio, 
+							spots=CLI_SPOTS[args.spots],
+							strategy=CLI_STRATEGIES[args.strategy]())
+	except ValueError, e:
+		parser.error("%s: %s" % (args.input, e))
+	finally:
+		if infile is not sys.stdin:
+			infile.close()
+	read = time.time()
+
+	try:
+		cloud.arrange(beam=args.beam)
+	except Exception, e:
+		## A strategy raises a plain Exception if it finds no place.
+		sys.stderr.write("%s: error: can't arrange %s: %s\n" 
+							% (parser.prog, args.input, e))
+		return 1
+	arranged = time.time()
+
+	outfile = args.output == "-" and sys.stdout or open(args.output, "wb")
+	try:
+		_write_rects(outfile, cloud.get_rects(), fmt)
+	finally:
+		if outfile is sys.stdout:
+			outfile.flush()
+		else:
+			outfile.close()
+	written = time.time()
+
+	if args.stats:
+		rects = cloud.get_rects()
+		area = sum(r.get_area() for r in rects)
+		occ = rects and cloud.get_occupied_rect() or Rectangle()
+		sys.stderr.write(
+			"rects: %i\nread: %.3f s\narrange: %.3f s\nwrite: %.3f s\n"
+			"occupied: %r x %r at (%r, %r)\ndensity: %.4f\n" % (
+				len(rects), read - start, arranged - read, 
+				written - arranged, occ.w, occ.h, occ.x, occ.y,
+				occ and area / float(occ.get_area()) or 0))
+	return 0
+
+
+def _layout_batch(jobs):
+	"""Arrange the *jobs* of a LayoutServer in a worker process. Return 
+	the HTTP status and reply of each, an error if it failed.
+	"""
+
+	replies = []
+	for job in jobs:
+		try:
+			cloud = RectangleCloud(
+				[Rectangle(0, 0, w, h) for w, h in job["sizes"]],
+				job["ratio"], CLI_SPOTS[job["spots"]],
+				CLI_STRATEGIES[job["strategy"]]())
+			cloud.arrange(beam=job["beam"])
+			replies.append((200, 
+						dict(rects=[list(r) for r in cloud.get_rects()])))
+		except Exception, e:
+			replies.append((500, 
+						dict(error="%s: %s" % (e.__class__.__name__, e))))
+	return replies
+
+
+class _LayoutJob(object):
+	def __init__(self, job):
+		self.job = job
+		self.size = len(job["sizes"])
+		self.start = time.time()
+		self.done = threading.Event()
+		self.status = self.reply = None
+
+
+class _LayoutRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+	def do_GET(self):
+		if self.path == "/metrics":
+			self._send(200, self.server.get_metrics())
+		else:
+			self._send(404, dict(error="Not found: %s" % self.path))
+
+	def do_POST(self):
+		if self.path != "/layout":
+			self._send(404, dict(error="Not found: %s" % self.path))
+			return
+		try:
+			length = int(self.headers.get("Content-Length", 0))
+			job = self.server.parse_job(json.loads(self.rfile.read(length)))
+		except ValueError, e:
+			self._send(400, dict(error=str(e)))
+			return
+		self._send(*self.server.submit(job))
+
+	def _send(self, status, reply):
+		body = json.dumps(reply)
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		pass
+
+
+class LayoutServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+	"""An HTTP server of layouts on *address* (host, port), localhost 
+	and a free port by default.
+
+	POST /layout takes a JSON object of "sizes", a list of [w, h], and
+	optionally "ratio", "strategy", "spots" and "beam" as in main, and
+	replies with "rects", a list of [x, y, w, h]. GET /metrics replies 
+	with the counts, latencies and throughput of the jobs.
+
+	Jobs are arranged by a pool of *processes* worker processes. Jobs 
+	that come in within *batch_delay* seconds are sent to a worker 
+	together, up to *batch_size* jobs of *batch_rects* Rectangles in 
+	total. Beyond *max_pending* jobs that are not done yet, jobs are 
+	refused with status 503. A job that isn't done after *timeout* 
+	seconds, e.g. because its worker died, fails with status 504.
+
+	Call self.serve_forever to serve, and self.close to stop.
+	"""
+
+	daemon_threads = True
+
+	## Jobs whose latencies GET /metrics reports.
+	LATENCIES = 1024
+
+	def __init__(self, address=("127.0.0.1", 0), processes=None, 
+					batch_size=32, batch_delay=0.005, batch_rects=1000,
+					max_pending=256, timeout=60):
+		BaseHTTPServer.HTTPServer.__init__(self, address, 
+											_LayoutRequestHandler)
+		self.batch_size = batch_size
+		self.batch_delay = batch_delay
+		self.batch_rects = batch_rects
+		self.timeout = timeout
+		self._slots = threading.BoundedSemaphore(max_pending)
+		self._queue = Queue.Queue()
+		self._lock = threading.Lock()
+		self._started = time.time()
+		self._latencies = collections.deque(maxlen=self.LATENCIES)
+		self.jobs = self.pending = self.batches = self.batched = 0
+		self.rejected = self.errors = 0
+		self._serving = False
+
+		self._pool = multiprocessing.Pool(processes)
+		self._dispatcher = threading.Thread(target=self._dispatch)
+		self._dispatcher.daemon = True
+		self._dispatcher.start()
+
+	def parse_job(self, obj):
+		"""Return the job of the request *obj*, with the defaults of 
+		what is missing. Raise ValueError if it is not a job.
+		"""
+
+		if not isinstance(obj, dict) or not isinstance(
+				obj.get("sizes"), list):
+			raise ValueError("Expected an object with a list of sizes")
+		job = dict(ratio=1.0, strategy="maxrects", spots="maximal", beam=1)
+		job.update(obj)
+		try:
+			job["sizes"] = [(float(w), float(h)) for w, h in job["sizes"]]
+			job["ratio"] = float(job["ratio"])
+			job["beam"] = int(job["beam"])
+		except (TypeError, ValueError):
+			raise ValueError("Expected sizes [w, h], a ratio and a beam")
+		for size in job["sizes"]:
+			if not all(0 <= n < float("inf") for n in size):
+				raise ValueError("Expected sizes of at least 0, got %r" 
+									% (list(size),))
+		if job["strategy"] not in CLI_STRATEGIES:
+			raise ValueError("Unknown strategy: %r" % job["strategy"])
+		if job["spots"] not in CLI_SPOTS:
+			raise ValueError("Unknown spots: %r" % job["spots"])
+		return job
+
+	def submit(self, job):
+		"""Arrange *job* as parsed by self.parse_job, and return the 
+		HTTP status and the reply. Blocks until the job is done, or for
+		self.timeout seconds.
+		"""
+
+		if not self._slots.acquire(False):
+			with self._lock:
+				self.rejected += 1
+			return 503, dict(error="Too many pending jobs")
+		try:
+			with self._lock:
+				self.pending += 1
+			pending = _LayoutJob(job)
+			self._queue.put(pending)
+			if pending.done.wait(self.timeout):
+				status, reply = pending.status, pending.reply
+			else:
+				status, reply = 504, dict(error="Layout timed out")
+		finally:
+			self._slots.release()
+		with self._lock:
+			self.pending -= 1
+			self.jobs += 1
+			self.errors += status != 200
+			self._latencies.append(time.time() - pending.start)
+		return status, reply
+
+	def _dispatch(self):
+		while True:
+			job = self._queue.get()
+			if job is None:
+				return
+			batch = [job]
+			size = job.size
+			deadline = time.time() + self.batch_delay
+			while len(batch) < self.batch_size and size < self.batch_rects:
+				timeout = deadline - time.time()
+				if timeout <= 0:
+					break
+				try:
+					job = self._queue.get(timeout=timeout)
+				except Queue.Empty:
+					break
+				if job is None:
+					self._queue.put(None)
+					break
+				batch.append(job)
+				size += job.size
+			with self._lock:
+				self.batches += 1
+				self.batched += len(batch)
+			## Python 2 has no error callback: a batch that fails in the
+			## pool, not in _layout_batch, times out in self.submit.
+			try:
+				self._pool.apply_async(_layout_batch, 
+									([j.job for j in batch],),
+									callback=lambda replies, batch=batch:
+										self._finish(batch, replies))
+			except Exception, e:
+				self._finish(batch, [(500, dict(error="%s: %s" % (
+					e.__class__.__name__, e)))] * len(batch))
+
+	def _finish(self, batch, replies):
+		for job, (status, reply) in zip(batch, replies):
+			job.status, job.reply = status, reply
+			job.done.set()
+
+	def get_metrics(self):
+		"""Return a dict of the numbers of jobs done, pending, refused 
+		and failed, of the batches and the jobs per batch, the 
+		throughput in jobs per second since the start, and the mean and
+		percentiles of the latencies of the last jobs in seconds.
+		"""
+
+		with self._lock:
+			latencies = sorted(self._latencies)
+			metrics = dict(jobs=self.jobs, pending=self.pending, 
+				rejected=self.rejected, errors=self.errors, 
+				batches=self.batches, 
+				batch_jobs=self.batches and self.batched / float(self.batches))
+		uptime = time.time() - self._started
+		metrics.update(uptime=uptime, throughput=metrics["jobs"] / uptime)
+		if latencies:
+			metrics["latency"] = dict(
+				mean=sum(latencies) / len(latencies),
+				p50=latencies[len(latencies) // 2],
+				p99=latencies[min(len(latencies) * 99 // 100, 
+									len(latencies) - 1)],
+				max=latencies[-1])
+		return metrics
+
+	def serve_forever(self, poll_interval=0.5):
+		self._serving = True
+		try:
+			BaseHTTPServer.HTTPServer.serve_forever(self, poll_interval)
+		finally:
+			self._serving = False
+
+	def close(self):
+		"""Stop serving, and the dispatcher and the worker processes."""
+
+		if self._serving:
+			self.shutdown()
+		self.server_close()
+		self._queue.put(None)
+		self._dispatcher.join()
+		self._pool.close()
+		self._pool.join()
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,18 @@
+from setuptools import setup
+
+import rectangles
+
+
+setup(
+	name="pyrectangles",
+	version=".".join(map(str, rectangles.__version__)),
+	description="Arranging rectangles into an elliptical shape "
+		"(a.k.a. tag-cloud).",
+	author=rectangles.__author__,
+	author_email=rectangles.__email__,
+	license=rectangles.__license__,
+	py_modules=["rectangles"],
+	entry_points={
+		"console_scripts": ["rectangles = rectangles:main"],
+	},
+)
@@ -1,9 +1,9 @@
-## inner horizontal
-rel_y = abs(cy - (rect.y + rect.h * (not sector_y)))
-rel_x = rel_y / tan
-cut_y = rect.y + rect.h * (not sector_y)
-cut_x = cx + rel_x * (sector_x or -1)
-
-## inner horizontal cut
-if (rect.x <= cut_x <= rect.x + rect.w):
+## inner horizontal
+rel_y = abs(cy - (rect.y + rect.h * (not sector_y)))
+rel_x = rel_y / tan
+cut_y = rect.y + rect.h * (not sector_y)
+cut_x = cx + rel_x * (sector_x or -1)
+
+## inner horizontal cut
+if (rect.x <= cut_x <= rect.x + rect.w):
 	res.extend(((), (cut_x, cut_y)))
\ No newline at end of file
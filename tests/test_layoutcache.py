@@ -0,0 +1,97 @@
+from __future__ import print_function
+
+from rectangles import (
+	Rectangle as R,
+	RectangleCloud,
+	LayoutCache,
+	SpotStrategy,
+	SkylineStrategy,
+	MaxRectsStrategy,
+)
+
+
+SIZES = [(10, 20), (5, 5), (30, 10), (10, 10), (15, 25)]
+
+
+def make_cloud(sizes=SIZES, **kwargs):
+	return RectangleCloud([R(0, 0, w, h) for w, h in sizes],
+							strategy=SkylineStrategy(), **kwargs)
+
+
+def test_get_key():
+	cache = LayoutCache()
+	key = cache.get_key(make_cloud())
+	assert key == cache.get_key(make_cloud([(float(w), h) for w, h in SIZES]))
+	assert key != cache.get_key(make_cloud(SIZES[::-1]))
+	assert key != cache.get_key(make_cloud(ratio=2.0))
+	assert key != cache.get_key(make_cloud(), beam=2)
+
+	cloud = make_cloud()
+	cloud.reuse_spots = True
+	assert key != cache.get_key(cloud)
+
+	cloud.strategy = SpotStrategy()
+	key = cache.get_key(cloud)
+	cloud.strategy = SpotStrategy()
+	assert key == cache.get_key(cloud)
+	cloud.strategy = SpotStrategy(vectorize=True)
+	assert key != cache.get_key(cloud)
+
+	cloud = make_cloud()
+	cloud.strategy = MaxRectsStrategy()
+	assert key != cache.get_key(cloud)
+
+
+def test_arrange():
+	cache = LayoutCache()
+	cloud = make_cloud()
+	cloud.arrange(cache=cache)
+	assert cache.get_stats() == dict(hits=0, disk_hits=0, misses=1, size=1)
+
+	hit = make_cloud()
+	hit.arrange(cache=cache)
+	assert hit.get_rects() == cloud.get_rects()
+	assert hit.get_occupied_rect() == cloud.get_occupied_rect()
+	assert cache.get_stats()["hits"] == 1
+
+
+def test_lru():
+	cache = LayoutCache(maxsize=2)
+	cache.put("a", [(0, 0)])
+	cache.put("b", [(1, 1)])
+	assert cache.get("a") == [(0, 0)]
+	cache.put("c", [(2, 2)])
+	assert cache.get("b") is None
+	assert cache.get("a") == [(0, 0)]
+	assert cache.get_stats() == dict(hits=2, disk_hits=0, misses=1, size=2)
+
+
+def test_disk(tmpdir):
+	path = str(tmpdir.join("layouts.sqlite"))
+	cache = LayoutCache(path=path)
+	cloud = make_cloud()
+	cloud.arrange(cache=cache)
+
+	## A new cache, as in another process.
+	cache = LayoutCache(maxsize=1, path=path)
+	hit = make_cloud()
+	hit.arrange(cache=cache)
+	assert hit.get_rects() == cloud.get_rects()
+	assert cache.get_stats() == dict(hits=1, disk_hits=1, misses=0, size=1)
+	cache.close()
+
+	## It opens the database again for a layout it doesn't hold.
+	other = make_cloud(SIZES[1:])
+	other.arrange(cache=cache)
+	assert cache.get_stats()["misses"] == 1
+	cache.close()
+
+
+def test_timeout():
+	cache = LayoutCache()
+	cloud = make_cloud()
+	cloud.arrange(beam=2, timeout=0, cache=cache)
+	assert cache.get_stats()["size"] == 0
+
+	cloud.arrange(beam=2, cache=cache)
+	assert cache.get_stats()["size"] == 1
@@ -0,0 +1,102 @@
+from __future__ import print_function
+
+import json
+import array
+import random
+
+import pytest
+
+import rectangles
+from rectangles import (
+	Rectangle as R,
+	RectangleCloud,
+	SkylineStrategy,
+	main,
+)
+
+
+SIZES = [(10, 20), (5, 5), (30, 10), (10, 10), (15, 25)]
+
+
+def expected_rects(sizes=SIZES):
+	cloud = RectangleCloud([R(0, 0, w, h) for w, h in sizes], 
+							strategy=SkylineStrategy())
+	cloud.arrange()
+	return [tuple(r) for r in cloud.get_rects()]
+
+
+def run(tmpdir, name, data, *args):
+	infile, outfile = tmpdir.join(name), tmpdir.join("out")
+	infile.write(data, "wb")
+	assert main([str(infile), "-o", str(outfile), "-s", "skyline"] 
+				+ list(args)) == 0
+	return outfile.read("rb")
+
+
+def test_csv(tmpdir):
+	data = "w,h\n" + "".join("%s,%s\n" % size for size in SIZES)
+	out = run(tmpdir, "sizes.csv", data)
+	assert [tuple(map(float, line.split(","))) 
+			for line in out.splitlines()] == expected_rects()
+
+	with pytest.raises(SystemExit):
+		run(tmpdir, "sizes.csv", data + "5,x\n")
+
+
+def test_jsonl(tmpdir):
+	data = "".join(json.dumps(dict(w=w, h=h)) + "\n" for w, h in SIZES)
+	data += "[3, 4]\n"
+	out = run(tmpdir, "sizes.json", data)
+	assert [tuple(json.loads(line)[c] for c in "xywh")
+			for line in out.splitlines()] == expected_rects(SIZES + [(3, 4)])
+
+
+@pytest.mark.parametrize("chunk", [4096, 2])
+def test_binary(tmpdir, monkeypatch, chunk):
+	monkeypatch.setattr(rectangles, "CLI_CHUNK", chunk)
+	data = array.array("d", [c for size in SIZES for c in size])
+	out = array.array("d")
+	out.fromstring(run(tmpdir, "sizes", data.tostring(), "-f", "binary"))
+	assert zip(out[0::4], out[1::4], out[2::4], out[3::4]) == \
+		expected_rects()
+
+	with pytest.raises(SystemExit):
+		run(tmpdir, "sizes", data.tostring() + "\0" * 3, "-f", "binary")
+
+
+def test_stats(tmpdir, capsys):
+	run(tmpdir, "sizes.csv", "10,20\n5,5\n", "--stats")
+	err = capsys.readouterr()[1]
+	assert "rects: 2\n" in err
+	assert "occupied: 15 x 20 at (0, 0)\n" in err
+	assert "density: 0.7500\n" in err
+
+
+@pytest.mark.parametrize("size", ["randint", "uniform"])
+def test_default_strategy(tmpdir, size):
+	rnd = random.Random(0)
+	size = getattr(rnd, size)
+	sizes = [(size(1, 30), size(1, 30)) for i in range(30)]
+	infile, outfile = tmpdir.join("sizes.csv"), tmpdir.join("out")
+	infile.write("".join("%r,%r\n" % size for size in sizes))
+	assert main([str(infile), "-o", str(outfile)]) == 0
+	rects = [R(*map(float, line.split(",")))
+				for line in outfile.read().splitlines()]
+	assert [(r.w, r.h) for r in rects] == sizes
+	assert RectangleCloud(rects).is_valid()
+
+
+@pytest.mark.parametrize("error", [
+	ValueError("Rectangle.w must be positive"),
+	Exception("No candidates were found."),
+])
+def test_arrange_error(tmpdir, capsys, monkeypatch, error):
+	def fail(self, **kwargs):
+		raise error
+	monkeypatch.setattr(RectangleCloud, "arrange", fail)
+	infile = tmpdir.join("sizes.csv")
+	infile.write("10,20\n5,5\n")
+	assert main([str(infile), "-o", str(tmpdir.join("out"))]) == 1
+	err = capsys.readouterr()[1]
+	assert "error: can't arrange" in err
+	assert str(error) in err
@@ -0,0 +1,141 @@
+from __future__ import print_function
+
+import json
+import random
+import httplib
+import threading
+
+import pytest
+
+from rectangles import (
+	Rectangle as R,
+	RectangleCloud,
+	SkylineStrategy,
+	LayoutServer,
+	main,
+)
+
+
+SIZES = [(10, 20), (5, 5), (30, 10), (10, 10), (15, 25)]
+
+
+@pytest.fixture
+def server(request):
+	kwargs = getattr(request, "param", {})
+	server = LayoutServer(processes=1, batch_delay=0.05, **kwargs)
+	thread = threading.Thread(target=server.serve_forever)
+	thread.daemon = True
+	thread.start()
+	yield server
+	server.close()
+	thread.join()
+
+
+def call(server, method, path, body=None):
+	connection = httplib.HTTPConnection(*server.server_address)
+	connection.request(method, path, body and json.dumps(body))
+	response = connection.getresponse()
+	reply = json.loads(response.read())
+	connection.close()
+	return response.status, reply
+
+
+def test_layout(server):
+	status, reply = call(server, "POST", "/layout", 
+							dict(sizes=SIZES, strategy="skyline"))
+	assert status == 200
+	cloud = RectangleCloud([R(0, 0, w, h) for w, h in SIZES], 
+							strategy=SkylineStrategy())
+	cloud.arrange()
+	assert [tuple(r) for r in reply["rects"]] == \
+		[tuple(r) for r in cloud.get_rects()]
+
+
+def test_batching(server):
+	replies = []
+	def post(sizes):
+		replies.append(call(server, "POST", "/layout", 
+							dict(sizes=sizes, strategy="maxrects")))
+	threads = [threading.Thread(target=post, args=(SIZES[:i],)) 
+				for i in range(1, 6)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert sorted(len(reply["rects"]) for status, reply in replies) == \
+		range(1, 6)
+
+	status, metrics = call(server, "GET", "/metrics")
+	assert status == 200
+	assert metrics["jobs"] == 5 and metrics["pending"] == 0
+	assert metrics["batches"] < 5
+	assert metrics["latency"]["max"] >= metrics["latency"]["p50"] > 0
+
+
+def test_errors(server):
+	assert call(server, "POST", "/layout", dict(sizes=[[1]]))[0] == 400
+	assert call(server, "POST", "/layout", 
+				dict(sizes=SIZES, strategy="none"))[0] == 400
+	assert call(server, "GET", "/nothing")[0] == 404
+
+
+@pytest.mark.parametrize("server", [dict(max_pending=0)], indirect=True)
+def test_backpressure(server):
+	status, reply = call(server, "POST", "/layout", dict(sizes=SIZES))
+	assert status == 503
+	assert call(server, "GET", "/metrics")[1]["rejected"] == 1
+
+
+def test_sizes(server):
+	for size in ([-1, 5], [5, -1], ["nan", 5], [1e400, 5]):
+		status, reply = call(server, "POST", "/layout", 
+								dict(sizes=SIZES + [size]))
+		assert status == 400
+	assert call(server, "GET", "/metrics")[1]["errors"] == 0
+
+
+@pytest.mark.parametrize("size", ["randint", "uniform"])
+def test_default(server, size):
+	rnd = random.Random(0)
+	size = getattr(rnd, size)
+	sizes = [(size(1, 30), size(1, 30)) for i in range(30)]
+	status, reply = call(server, "POST", "/layout", dict(sizes=sizes))
+	assert status == 200
+	rects = [R(*r) for r in reply["rects"]]
+	assert [(r.w, r.h) for r in rects] == sizes
+	assert RectangleCloud(rects).is_valid()
+
+
+def test_serve_errors(server, capsys):
+	for address in ("x", "localhost:", "70000", "-1"):
+		with pytest.raises(SystemExit) as e:
+			main(["--serve", address])
+		assert e.value.code == 2
+	address = "%s:%i" % server.server_address
+	assert main(["--serve", address, "-p", "1"]) == 1
+	assert "can't serve on %s" % address in capsys.readouterr()[1]
+
+
+class _LostPool(object):
+	"""A pool whose worker died with every batch."""
+
+	def apply_async(self, func, args, callback):
+		pass
+
+	def close(self):
+		pass
+
+	def join(self):
+		pass
+
+
+@pytest.mark.parametrize("server", [dict(timeout=0.2, max_pending=1)], 
+							indirect=True)
+def test_timeout(server):
+	server._pool, pool = _LostPool(), server._pool
+	for i in range(2):
+		status, reply = call(server, "POST", "/layout", dict(sizes=SIZES))
+		assert status == 504
+	server._pool = pool
+	assert call(server, "POST", "/layout", dict(sizes=SIZES))[0] == 200
+	assert call(server, "GET", "/metrics")[1]["errors"] == 2